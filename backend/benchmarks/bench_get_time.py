@@ -0,0 +1,61 @@
+"""
+Microbenchmark for the get_time tool.
+
+Compares the old behaviour (a new TimezoneFinder per call) with the cached
+finder + grid index in main.get_time, cold and warm.
+
+Run from the backend directory:
+    python benchmarks/bench_get_time.py
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Placeholders so module-level clients can be constructed; nothing here talks to a service.
+for name in ("OPENAI_API_KEY", "OPENROUTER_API_KEY", "AZURE_SPEECH_KEY", "AZURE_SPEECH_REGION"):
+    os.environ.setdefault(name, "offline-benchmark")
+
+from timezonefinder import TimezoneFinder
+
+import main
+
+ORLANDO = (28.5383, -81.3792)
+NEARBY = [(28.5383 + i * 0.013, -81.3792 - i * 0.017) for i in range(50)]
+
+
+def timed_ms(fn, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - started) * 1000
+
+
+def old_get_time_lookup(lat, lon):
+    tf = TimezoneFinder()
+    return tf.timezone_at(lat=lat, lng=lon)
+
+
+def summarize(label: str, samples_ms):
+    samples_ms = sorted(samples_ms)
+    p99 = samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * 0.99))]
+    print(f"{label:<38} n={len(samples_ms):<6} "
+          f"median={statistics.median(samples_ms):9.4f} ms  p99={p99:9.4f} ms")
+
+
+def main_bench():
+    summarize("old: new TimezoneFinder per call", [timed_ms(old_get_time_lookup, *ORLANDO) for _ in range(5)])
+
+    # Cold: nothing loaded, empty index
+    main._timezone_finder = None
+    main.timezone_for_cell.cache_clear()
+    summarize("new: cold (finder load + lookup)", [timed_ms(main.get_time, *ORLANDO)])
+
+    summarize("new: warm finder, new grid cells", [timed_ms(main.get_time, lat, lon) for lat, lon in NEARBY])
+    summarize("new: warm, same cell", [timed_ms(main.get_time, *ORLANDO) for _ in range(10000)])
+    print(f"grid index: {main.timezone_for_cell.cache_info()}")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,296 @@
+"""
+Benchmark for the text -> phrase -> audio pipeline with local stand-ins.
+
+Drives the real stream_openai_completion / process_chunks, TTS processors,
+PlaybackQueue and audio_player_sync, but with:
+  - a fake streaming chat completion (configurable first-token latency and token rate),
+  - fake TTS backends (configurable per-phrase latency and bandwidth),
+  - a null audio sink that keeps a virtual playback clock instead of a sound card.
+
+No network, credentials or audio device are used. Reports time to first token,
+first phrase, first audio, gaps in playback (the sink ran dry between phrases),
+when all audio had been handed to the sink, and total wall time (until the
+last sample would have finished playing).
+
+Run from the backend directory:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --tts openai --runs 10 --json
+    python benchmarks/bench_pipeline.py --fail-playback --timeout 10   # exits non-zero if the turn hangs
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from functools import partial
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Placeholders so module-level clients can be constructed; nothing here talks to a service.
+for name in ("OPENAI_API_KEY", "OPENROUTER_API_KEY", "AZURE_SPEECH_KEY", "AZURE_SPEECH_REGION"):
+    os.environ.setdefault(name, "offline-benchmark")
+
+import main
+
+SAMPLE_TEXT = (
+    "Sure! Here is a quick overview of the weather in Orlando today. "
+    "It is warm and humid, with a high of 31 degrees and a light breeze from the east. "
+    "There is a chance of scattered thunderstorms later this afternoon, so keep an umbrella handy. "
+    "Tonight it cools down to about 24 degrees. Tomorrow looks drier and a little less humid. "
+)
+METRICS = ("ttft_ms", "first_phrase_ms", "first_audio_ms", "gap_count", "gap_total_ms", "gap_max_ms",
+           "audio_ready_ms", "wall_ms")
+
+
+# =========== Fake chat completion ===========
+class FakeChatStream:
+    def __init__(self, words, first_token_ms, tokens_per_second):
+        self.words = words
+        self.first_token_ms = first_token_ms
+        self.tokens_per_second = tokens_per_second
+
+    async def __aiter__(self):
+        await asyncio.sleep(self.first_token_ms / 1000)
+        interval = 1 / self.tokens_per_second
+        for word in self.words:
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=word, tool_calls=None))],
+                usage=None,
+            )
+            await asyncio.sleep(interval)
+        yield SimpleNamespace(choices=[], usage=SimpleNamespace(
+            prompt_tokens=50, completion_tokens=len(self.words), total_tokens=50 + len(self.words),
+            prompt_tokens_details=None,
+        ))
+
+    async def close(self):
+        pass
+
+
+class FakeChatClient:
+    """Stands in for openai.AsyncOpenAI: chat.completions.create(...) returns a FakeChatStream."""
+    def __init__(self, words, first_token_ms, tokens_per_second):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self.words = words
+        self.first_token_ms = first_token_ms
+        self.tokens_per_second = tokens_per_second
+
+    async def create(self, **kwargs):
+        return FakeChatStream(self.words, self.first_token_ms, self.tokens_per_second)
+
+
+# =========== Fake TTS backends ===========
+class FakeSpeechModel:
+    """Per-phrase latency, then PCM for the phrase at a fixed bandwidth."""
+    def __init__(self, latency_ms, bandwidth_bytes_per_second, playback_rate, chars_per_second=14):
+        self.latency_ms = latency_ms
+        self.bandwidth = bandwidth_bytes_per_second
+        self.bytes_per_second = playback_rate * 2
+        self.chars_per_second = chars_per_second
+
+    async def pcm_chunks(self, phrase, chunk_size):
+        await asyncio.sleep(self.latency_ms / 1000)
+        remaining = int(len(phrase) / self.chars_per_second * self.bytes_per_second) // 2 * 2
+        chunk = bytes(chunk_size)
+        while remaining > 0:
+            n = min(chunk_size, remaining)
+            yield chunk[:n]
+            remaining -= n
+            await asyncio.sleep(n / self.bandwidth)
+
+
+class FakeOpenAITTSClient:
+    """Stands in for the client used by openai_text_to_speech_processor."""
+    def __init__(self, model: FakeSpeechModel):
+        self.model = model
+        streaming = SimpleNamespace(create=self.create)
+        self.audio = SimpleNamespace(speech=SimpleNamespace(with_streaming_response=streaming))
+
+    @contextlib.asynccontextmanager
+    async def create(self, input, **kwargs):
+        yield SimpleNamespace(iter_bytes=partial(self.model.pcm_chunks, input))
+
+
+def fake_azure_processor(model: FakeSpeechModel):
+    """The Azure processor's look-ahead driver, with the SDK synthesis replaced by `model`."""
+    async def processor(phrase_queue, audio_queue, stop_event):
+        async def synthesize(phrase, phrase_audio):
+            async for chunk in model.pcm_chunks(phrase, 4096):
+                if stop_event.is_set():
+                    return False
+                phrase_audio.write(chunk)
+            return True
+
+        lookahead = main.CONFIG["TTS_MODELS"]["AZURE_TTS"]["SYNTHESIS_LOOKAHEAD"]
+        synthesize_timed = main.with_tts_request_timing(synthesize, "FakeAzure")
+        await main.synthesize_with_lookahead(phrase_queue, audio_queue, stop_event, lookahead, synthesize_timed, "FakeAzure")
+    return processor
+
+
+# =========== Null audio sink ===========
+class NullAudioSink:
+    """
+    Stands in for AudioPlayer. Nothing is played; a virtual playback clock
+    advances by each chunk's duration, and any time the data arrives after
+    the clock ran out is recorded as a playback gap. With `realtime`, writes
+    block like a device buffer of `max_buffer_ms` would. With `fail`,
+    opening the stream raises, like a missing output device.
+    """
+    def __init__(self, playback_rate, realtime=False, max_buffer_ms=500, fail=False):
+        self.bytes_per_second = playback_rate * 2
+        self.realtime = realtime
+        self.fail = fail
+        self.max_buffer = max_buffer_ms / 1000
+        self.first_audio_at = None
+        self.clock = 0.0
+        self.gaps_ms = []
+        self.last_stopped_at = None
+
+    def start_stream(self):
+        if self.fail:
+            raise OSError("output device unavailable (--fail-playback)")
+
+    def write_audio(self, data):
+        now = time.perf_counter()
+        if self.first_audio_at is None:
+            self.first_audio_at = self.clock = now
+        elif now > self.clock:
+            gap_ms = (now - self.clock) * 1000
+            if gap_ms >= 1:
+                self.gaps_ms.append(gap_ms)
+            self.clock = now
+        self.clock += len(data) / self.bytes_per_second
+        if self.realtime and self.clock - now > self.max_buffer:
+            time.sleep(self.clock - now - self.max_buffer)
+
+    def drain(self, timeout=30.0):
+        if self.realtime:
+            time.sleep(max(0.0, self.clock - time.perf_counter()))
+
+    def stop_stream(self):
+        self.last_stopped_at = time.perf_counter()
+
+    def flush(self):
+        pass
+
+
+class TimedPhraseQueue(asyncio.Queue):
+    """Records when the first phrase is handed to TTS."""
+    first_phrase_at = None
+
+    async def put(self, item):
+        if item is not None and self.first_phrase_at is None:
+            self.first_phrase_at = time.perf_counter()
+        await super().put(item)
+
+
+# =========== Runner ===========
+async def run_once(args) -> dict:
+    provider = "OPENAI_TTS" if args.tts == "openai" else "AZURE_TTS"
+    playback_rate = main.CONFIG["TTS_MODELS"][provider]["PLAYBACK_RATE"]
+    speech = FakeSpeechModel(args.tts_latency_ms, args.tts_bandwidth_kbps * 1024, playback_rate)
+    if args.tts == "openai":
+        tts_processor = partial(main.openai_text_to_speech_processor, openai_client=FakeOpenAITTSClient(speech))
+    else:
+        tts_processor = fake_azure_processor(speech)
+
+    words = [w + " " for w in (SAMPLE_TEXT * (args.words // len(SAMPLE_TEXT.split()) + 1)).split()[:args.words]]
+    main.client = FakeChatClient(words, args.first_token_ms, args.tokens_per_second)
+
+    phrase_queue = TimedPhraseQueue()
+    audio_queue = main.PlaybackQueue()
+    stop_event = asyncio.Event()
+    sink = NullAudioSink(playback_rate, realtime=args.realtime, fail=args.fail_playback)
+
+    started = time.perf_counter()
+    tts_task = asyncio.create_task(tts_processor(phrase_queue, audio_queue, stop_event))
+    player_task = asyncio.create_task(main.start_audio_player_async(audio_queue, stop_event, sink))
+
+    first_token_at = None
+    messages = [main.SYSTEM_PROMPT, {"role": "user", "content": "What's the weather like?"}]
+    async for _ in main.stream_openai_completion(messages, phrase_queue, asyncio.Event()):
+        if first_token_at is None:
+            first_token_at = time.perf_counter()
+    await phrase_queue.put(None)
+    await asyncio.gather(tts_task, player_task)
+    audio_ready = time.perf_counter()
+    finished = max(audio_ready, sink.clock)
+
+    def since_start(t):
+        return (t - started) * 1000 if t is not None else float("nan")
+
+    return {
+        "ttft_ms": since_start(first_token_at),
+        "first_phrase_ms": since_start(phrase_queue.first_phrase_at),
+        "first_audio_ms": since_start(sink.first_audio_at),
+        "gap_count": len(sink.gaps_ms),
+        "gap_total_ms": sum(sink.gaps_ms),
+        "gap_max_ms": max(sink.gaps_ms, default=0.0),
+        "audio_ready_ms": since_start(audio_ready),
+        "wall_ms": since_start(finished),
+    }
+
+
+def summarize(runs):
+    summary = {}
+    for metric in METRICS:
+        samples = sorted(run[metric] for run in runs)
+        summary[metric] = {
+            "median": statistics.median(samples),
+            "p90": samples[min(len(samples) - 1, int(len(samples) * 0.9))],
+            "max": samples[-1],
+        }
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tts", choices=("azure", "openai"), default=main.CONFIG["GENERAL_TTS"]["TTS_PROVIDER"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--words", type=int, default=80, help="length of the fake answer")
+    parser.add_argument("--first-token-ms", type=float, default=300)
+    parser.add_argument("--tokens-per-second", type=float, default=60)
+    parser.add_argument("--tts-latency-ms", type=float, default=150, help="per-phrase time to first byte")
+    parser.add_argument("--tts-bandwidth-kbps", type=float, default=256, help="KiB/s of PCM per phrase")
+    parser.add_argument("--realtime", action="store_true", help="let the null sink block like a real device")
+    parser.add_argument("--tts-cache", action="store_true", help="keep the phrase audio cache enabled")
+    parser.add_argument("--fail-playback", action="store_true",
+                        help="make the sink fail to open; checks the turn still finishes instead of hanging")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds before a run counts as hung")
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline's own logging")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    return parser.parse_args(argv)
+
+
+def main_bench(argv=None):
+    args = parse_args(argv)
+    main.CONFIG["GENERAL_TTS"]["AUDIO_CACHE"]["ENABLED"] = args.tts_cache
+    if not args.verbose:
+        main.CONFIG["LOGGING"]["LEVEL"] = "error"
+
+    runs = []
+    for _ in range(args.runs):
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+            try:
+                runs.append(asyncio.run(asyncio.wait_for(run_once(args), args.timeout)))
+            except asyncio.TimeoutError:
+                sys.exit(f"run {len(runs) + 1} did not finish within {args.timeout:.0f} s")
+    summary = summarize(runs)
+
+    if args.json:
+        print(json.dumps({"config": vars(args), "summary": summary, "runs": runs}, indent=2))
+        return
+    print(f"tts={args.tts} runs={args.runs} words={args.words} first_token={args.first_token_ms:.0f} ms "
+          f"rate={args.tokens_per_second:.0f} tok/s tts_latency={args.tts_latency_ms:.0f} ms "
+          f"tts_bandwidth={args.tts_bandwidth_kbps:.0f} KiB/s")
+    for metric, stats in summary.items():
+        print(f"{metric:<16} median={stats['median']:9.1f}  p90={stats['p90']:9.1f}  max={stats['max']:9.1f}")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,100 @@
+"""
+Microbenchmark for phrase segmentation.
+
+Compares the old process_chunks loop (append each delta to a working string
+and re-run the delimiter regex over all of it) with main.StreamingSegmenter,
+which scans only new characters. Both are fed the same text in small deltas,
+like a streamed completion.
+
+Run from the backend directory:
+    python benchmarks/bench_segmenter.py
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Placeholders so module-level clients can be constructed; nothing here talks to a service.
+for name in ("OPENAI_API_KEY", "OPENROUTER_API_KEY", "AZURE_SPEECH_KEY", "AZURE_SPEECH_REGION"):
+    os.environ.setdefault(name, "offline-benchmark")
+
+import main
+
+DELIMITERS = main.CONFIG["PROCESSING_PIPELINE"]["DELIMITERS"]
+PROSE = ("Sure! The forecast for Orlando shows a high of 31 degrees today. "
+         "Expect scattered storms after 3 p.m., so plan accordingly? ") * 30
+CODE_LINE = "result = compute_value(alpha, beta, gamma) + offset_table[index] // scale; "
+SCENARIOS = {
+    "prose (2 KB)": PROSE[:2000],
+    "no delimiter (8 KB)": CODE_LINE * 110,
+    "no delimiter (32 KB)": CODE_LINE * 440,
+}
+
+
+def deltas(text, size=4):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def old_segment(chunks, character_max):
+    """The segmentation part of the previous process_chunks, minus the queues."""
+    delimiter_pattern = main.compile_delimiter_pattern(DELIMITERS)
+    working_string = ""
+    chars_processed = 0
+    segmentation_active = True
+    phrases = []
+    for content in chunks:
+        working_string += content
+        if segmentation_active:
+            while True:
+                match = delimiter_pattern.search(working_string)
+                if match:
+                    end_idx = match.end()
+                    phrase = working_string[:end_idx].strip()
+                    if phrase:
+                        phrases.append(phrase)
+                        chars_processed += len(phrase)
+                    working_string = working_string[end_idx:]
+                    if chars_processed >= character_max:
+                        segmentation_active = False
+                        break
+                else:
+                    break
+    if working_string.strip():
+        phrases.append(working_string.strip())
+    return phrases
+
+
+def new_segment(chunks, character_max):
+    segmenter = main.StreamingSegmenter(DELIMITERS, character_max)
+    phrases = []
+    for content in chunks:
+        phrases.extend(segmenter.feed(content))
+    remainder = segmenter.flush()
+    if remainder:
+        phrases.append(remainder)
+    return phrases
+
+
+def timed_ms(fn, *args, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def main_bench():
+    character_max = main.CONFIG["PROCESSING_PIPELINE"]["CHARACTER_MAXIMUM"]
+    print(f"{'scenario':<22} {'deltas':>7} {'old ms':>9} {'new ms':>9} {'old phrases':>12} {'new phrases':>12}")
+    for label, text in SCENARIOS.items():
+        chunks = deltas(text)
+        old_ms, old_phrases = timed_ms(old_segment, chunks, character_max)
+        new_ms, new_phrases = timed_ms(new_segment, chunks, character_max)
+        print(f"{label:<22} {len(chunks):>7} {old_ms:>9.2f} {new_ms:>9.2f} {len(old_phrases):>12} {len(new_phrases):>12}")
+
+
+if __name__ == "__main__":
+    main_bench()
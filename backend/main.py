@@ -7,9 +7,21 @@ import requests
 import openai
 import inspect
 import re
+import uuid
+import time
+import typing
+import hashlib
+import contextvars
+import queue
+import random
+import sys
+import unicodedata
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from queue import Queue
-from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple, Union, Set
+from types import MappingProxyType
+from functools import lru_cache, partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Literal, Mapping, Optional, Sequence, Tuple, Union, Set
 
 import uvicorn
 import pyaudio
@@ -18,6 +30,7 @@ import azure.cognitiveservices.speech as speechsdk
 import pytz
 from timezonefinder import TimezoneFinder
 
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
 from fastapi import FastAPI, HTTPException, APIRouter, WebSocket, WebSocketDisconnect, Request, Response, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
@@ -45,13 +58,32 @@ CONFIG = {
 
     "GENERAL_TTS": {
         "TTS_PROVIDER": "azure",
-        "TTS_ENABLED": True
+        "TTS_ENABLED": True,
+        # Synthesized audio of short, recurring phrases ("Sure!"), reused across turns
+        "AUDIO_CACHE": {
+            "ENABLED": True,
+            "MAX_PHRASE_CHARS": 80,
+            "MEMORY_MAX_BYTES": 16 * 1024 * 1024,
+            # Directory of raw PCM files (None = memory only)
+            "DISK_DIR": os.path.join(os.path.dirname(os.path.abspath(__file__)), "tts_cache"),
+            "DISK_MAX_BYTES": 256 * 1024 * 1024,
+        },
     },
 
     "PROCESSING_PIPELINE": {
         "USE_SEGMENTATION": True,
         "DELIMITERS": ["\n", ". ", "? ", "! ", "* "],
+        # Every delimiter splits for the first CHARACTER_MAXIMUM characters; after that the
+        # minimum phrase length grows by SEGMENT_GROWTH_FACTOR per phrase, up to MAX_SEGMENT_CHARS.
+        # Text running past MAX_SEGMENT_CHARS without a boundary (code blocks too) is cut at a word boundary.
         "CHARACTER_MAXIMUM": 50,
+        "SEGMENT_GROWTH_FACTOR": 2.0,
+        "MAX_SEGMENT_CHARS": 400,
+        # Opt-in "first-audio deadline": if no delimiter has shown up yet, emit the
+        # first phrase early (cut at a word boundary) after this many ms / characters.
+        "FIRST_PHRASE_DEADLINE_ENABLED": False,
+        "FIRST_PHRASE_DEADLINE_MS": 400,
+        "FIRST_PHRASE_DEADLINE_CHARS": 40,
     },
     "TTS_MODELS": {
         "OPENAI_TTS": {
@@ -65,7 +97,9 @@ CONFIG = {
                 "mp3": 44100,
                 "wav": 48000
             },
-            "PLAYBACK_RATE": 24000
+            "PLAYBACK_RATE": 24000,
+            # Phrases whose HTTP requests may be in flight ahead of playback (0 = one at a time)
+            "PREFETCH_PHRASES": 3
         },
         "AZURE_TTS": {
             "TTS_SPEED": "0%",
@@ -80,6 +114,11 @@ CONFIG = {
                 "Raw48Khz16BitMonoPcm": 48000
             },
             "PLAYBACK_RATE": 24000,
+            # How many upcoming phrases may be synthesized while the current one plays
+            "SYNTHESIS_LOOKAHEAD": 2,
+            # Pre-connected synthesizers kept alive between chats (should be >= lookahead + 1)
+            "SYNTHESIZER_POOL_SIZE": 3,
+            "PREWARM_SYNTHESIZERS": True,
             "ENABLE_PROFANITY_FILTER": False,
             "STABILITY": 0,
             "PROSODY": {
@@ -89,16 +128,91 @@ CONFIG = {
             }
         }
     },
+    "CONVERSATIONS": {
+        # Server-side chat histories (shared by all websockets, LRU + idle expiry)
+        "MAX_CONVERSATIONS": 100,
+        "IDLE_TTL_SECONDS": 3600,
+    },
+    "CONTEXT_WINDOW": {
+        # Prompt budget per turn (system prompt + summary + recent history)
+        "MAX_PROMPT_TOKENS": 6000,
+        # Over budget, trim the window down to this fraction in one step
+        "TRIM_TO_RATIO": 0.75,
+        # Summarize older turns in the background once the window passes this fraction
+        "SUMMARIZE": True,
+        "SUMMARIZE_AT_RATIO": 0.6,
+        "KEEP_RECENT_MESSAGES": 6,
+        "SUMMARY_MAX_TOKENS": 250,
+        # Approximate per-message overhead of the chat format
+        "TOKENS_PER_MESSAGE": 4,
+    },
+    "RESPONSE_CACHE": {
+        # Replays whole answers (text + played audio) for repeated questions; skips LLM and TTS
+        "ENABLED": False,
+        "TTL_SECONDS": 3600,
+        "MAX_ENTRIES": 64,
+        # Preceding messages that are part of the key, so follow-ups like "and tomorrow?" don't collide
+        "CONTEXT_MESSAGES": 2,
+        # Per-tool freshness; answers using a tool not listed here are never cached
+        "TOOL_TTL_SECONDS": {
+            "fetch_weather": 600,
+            "get_time": 0,
+        },
+    },
+    "TOOLS": {
+        # Sync tools run on this many worker threads; every call gets TIMEOUT_SECONDS
+        "MAX_WORKERS": 4,
+        "TIMEOUT_SECONDS": 15,
+        # Agent loop: tool-enabled rounds per turn, and the prompt+completion token
+        # budget after which the model must answer without further tool calls
+        "MAX_TOOL_ROUNDS": 3,
+        "TURN_TOKEN_BUDGET": 12000,
+        "WEATHER_CACHE": {
+            "TTL_SECONDS": 600,
+            "MAX_ENTRIES": 256,
+            # Decimal places lat/lon are rounded to (2 ~= 1 km buckets)
+            "COORD_PRECISION": 2,
+            # JSON file to keep the cache across restarts; None keeps it in memory only
+            "PERSIST_PATH": None
+        },
+        # get_time resolves time zones per lat/lon grid cell of this many decimals
+        "TIMEZONE_GRID_PRECISION": 2
+    },
+    "MICROPHONE": {
+        # One capture feeds every consumer (Porcupine + Azure STT), so this must
+        # match Porcupine's sample rate (16 kHz, 16-bit mono).
+        "SAMPLE_RATE": 16000,
+        "FRAMES_PER_BUFFER": 512,
+        "RING_BUFFER_SECONDS": 2.0,
+        "STT_PUSH_FRAMES": 1600
+    },
     "AUDIO_PLAYBACK_CONFIG": {
         "FORMAT": 16,
         "CHANNELS": 1,
-        "RATE": None
+        "RATE": None,
+        # Preallocated size of each phrase's PCM buffer (~4 s at 24 kHz, 16-bit); grows if exceeded
+        "SEGMENT_BUFFER_BYTES": 192000,
+        # Largest slice the playback thread pulls per write
+        "PLAYBACK_CHUNK_BYTES": 4096,
+        # Callback-mode output: frames per PyAudio callback and jitter buffer depth
+        "FRAMES_PER_BUFFER": 1024,
+        "JITTER_TARGET_MS": 120,
+        "JITTER_MAX_MS": 500
     },
     "LOGGING": {
         "PRINT_ENABLED": True,
         "PRINT_SEGMENTS": True,
         "PRINT_TOOL_CALLS": True,
-        "PRINT_FUNCTION_CALLS": True
+        "PRINT_FUNCTION_CALLS": True,
+        # Everything below can be changed at runtime via /api/logging.
+        # Minimum level: "debug" (segments), "info", "warning", "error"
+        "LEVEL": "debug",
+        # Fraction of records kept per category (e.g. {"segment": 0.1})
+        "SAMPLE_RATES": {},
+        # "json" (one object per line) or "text" ("[SEGMENT] ...")
+        "FORMAT": "json",
+        # Records waiting for the writer thread; beyond this they are dropped, never blocking
+        "QUEUE_SIZE": 10000
     }
 }
 
@@ -123,15 +237,134 @@ elif API_HOST == "openrouter":
 
 
 # ============ Helper Logging ============
-def conditional_print(message: str, print_type: str = "default"):
-    if print_type == "segment" and CONFIG["LOGGING"]["PRINT_SEGMENTS"]:
-        print(f"[SEGMENT] {message}")
-    elif print_type == "tool_call" and CONFIG["LOGGING"]["PRINT_TOOL_CALLS"]:
-        print(f"[TOOL CALL] {message}")
-    elif print_type == "function_call" and CONFIG["LOGGING"]["PRINT_FUNCTION_CALLS"]:
-        print(f"[FUNCTION CALL] {message}")
-    elif CONFIG["LOGGING"]["PRINT_ENABLED"]:
-        print(f"[INFO] {message}")
+LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+# print_type -> (enable flag, default level, text prefix)
+LOG_CATEGORIES = {
+    "segment": ("PRINT_SEGMENTS", "debug", "[SEGMENT]"),
+    "tool_call": ("PRINT_TOOL_CALLS", "info", "[TOOL CALL]"),
+    "function_call": ("PRINT_FUNCTION_CALLS", "info", "[FUNCTION CALL]"),
+    "default": ("PRINT_ENABLED", "info", "[INFO]"),
+}
+
+# Chat session the current task works for; set by the websocket handler and
+# inherited by the tasks it starts.
+log_session_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("log_session_id", default=None)
+
+class AsyncLogWriter:
+    """
+    Log records are put on a bounded queue by the caller and formatted and
+    written by a daemon thread, so a slow terminal or journald pipe never
+    stalls the event loop. When the queue is full, records are dropped (and
+    counted) instead of blocking.
+    """
+    def __init__(self, max_queue: int, stream=None):
+        self.stream = stream
+        self.dropped = 0
+        self.written = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def emit(self, level: str, category: str, message: str):
+        try:
+            self._queue.put_nowait((time.monotonic(), time.time(), level, category, log_session_id.get(), message))
+        except queue.Full:
+            self.dropped += 1
+
+    def _format(self, record: tuple) -> str:
+        monotonic, wall, level, category, session_id, message = record
+        if CONFIG["LOGGING"]["FORMAT"] == "text":
+            return f"{LOG_CATEGORIES.get(category, LOG_CATEGORIES['default'])[2]} {message}"
+        return json.dumps({
+            "ts": round(wall, 6), "mono": round(monotonic, 6), "level": level,
+            "category": category, "session_id": session_id, "message": str(message),
+        }, ensure_ascii=False)
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                return
+            lines = [self._format(record)]
+            # Write whatever else is already waiting in one go
+            while len(lines) < 256:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    self._write(lines)
+                    return
+                lines.append(self._format(record))
+            self._write(lines)
+
+    def _write(self, lines: List[str]):
+        stream = self.stream or sys.stdout
+        try:
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+            self.written += len(lines)
+        except Exception:
+            self.dropped += len(lines)
+
+    def close(self, timeout: float = 1.0):
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+log_writer = AsyncLogWriter(CONFIG["LOGGING"]["QUEUE_SIZE"])
+
+def conditional_print(message: str, print_type: str = "default", level: Optional[str] = None):
+    """
+    Logs `message` under a category (segment / tool_call / function_call /
+    default), subject to the category's PRINT_* flag, the minimum LEVEL and the
+    category's sample rate. Costs an enqueue; formatting and I/O happen on the
+    log writer thread.
+    """
+    settings = CONFIG["LOGGING"]
+    flag, default_level, _ = LOG_CATEGORIES.get(print_type, LOG_CATEGORIES["default"])
+    if not settings[flag]:
+        return
+    level = level or default_level
+    if LOG_LEVELS[level] < LOG_LEVELS[settings["LEVEL"]]:
+        return
+    sample_rate = settings["SAMPLE_RATES"].get(print_type)
+    if sample_rate is not None and random.random() >= sample_rate:
+        return
+    log_writer.emit(level, print_type, message)
+
+
+# =========== Metrics ===========
+# Prometheus metrics served at /metrics. Hot-path code only calls observe_stage()
+# or inc(); queue depth gauges are sampled when /metrics is scraped.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0, 30.0)
+
+PIPELINE_STAGE_SECONDS = Histogram(
+    "pipeline_stage_seconds",
+    "Duration of each chat pipeline stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+TTS_REQUEST_SECONDS = Histogram(
+    "tts_request_seconds",
+    "Per-phrase TTS latency: time to first audio byte and to completion",
+    ["provider", "phase"],
+    buckets=LATENCY_BUCKETS,
+)
+TOOL_CALL_SECONDS = Histogram(
+    "tool_call_seconds",
+    "Tool call duration by tool and outcome",
+    ["tool", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+SEGMENTS_EMITTED = Counter("pipeline_segments_total", "Phrases handed from the LLM stream to TTS")
+LLM_ROUNDS = Counter("llm_rounds_total", "Streamed completion rounds (including tool follow-ups)")
+QUEUE_DEPTH = Gauge("pipeline_queue_depth", "Items (chunks/phrases) or bytes (audio) waiting in each queue", ["queue"])
+
+def observe_stage(stage: str, seconds: float):
+    PIPELINE_STAGE_SECONDS.labels(stage).observe(seconds)
 
 
 # =========== Singleton PyAudio + AudioPlayer ===========
@@ -155,7 +388,134 @@ class PyAudioSingleton:
 pyaudio_instance = PyAudioSingleton()
 
 
+audio_path_stats = {
+    "chunks_in": 0,
+    "bytes_in": 0,
+    "chunks_out": 0,
+    "buffer_allocations": 0,
+    "buffer_grows": 0,
+    # One bytes object per PyAudio callback: the only copy the callback needs
+    "callback_copies": 0,
+    "underruns": 0,
+}
+
+
+class JitterBuffer:
+    """
+    Byte FIFO between the playback thread (producer) and PyAudio's output
+    callback (consumer), in a ring preallocated at `max_bytes`. The callback
+    never blocks: it waits until `target_bytes` are buffered before playing,
+    and pads any shortfall with silence, counting it as an underrun and
+    re-priming. Producers block while the ring is full so we never run far
+    ahead of the speaker.
+    """
+    def __init__(self, target_bytes: int, max_bytes: int):
+        self.target_bytes = target_bytes
+        self.max_bytes = max(max_bytes, target_bytes)
+        self._ring = bytearray(self.max_bytes)
+        self._head = 0
+        self._size = 0
+        self._cond = threading.Condition()
+        self._silence = b""
+        self.active = False
+        self.primed = False
+        self.draining = False
+        self.underruns = 0
+        audio_path_stats["buffer_allocations"] += 1
+
+    def _clear(self):
+        # Caller holds the lock.
+        self._head = 0
+        self._size = 0
+
+    def reset(self):
+        with self._cond:
+            self._clear()
+            self.active = True
+            self.primed = False
+            self.draining = False
+            self._cond.notify_all()
+
+    def write(self, data: bytes):
+        view = memoryview(data).cast("B")
+        capacity = len(self._ring)
+        with self._cond:
+            while view and self.active:
+                free = capacity - self._size
+                if not free:
+                    self._cond.wait()
+                    continue
+                n = min(free, len(view))
+                tail = (self._head + self._size) % capacity
+                first = min(n, capacity - tail)
+                self._ring[tail:tail + first] = view[:first]
+                self._ring[:n - first] = view[first:n]
+                self._size += n
+                self.draining = False
+                view = view[n:]
+
+    def _take(self, n: int, padding: bytes = b"") -> bytes:
+        # Caller holds the lock. Copies n bytes (plus padding) out in one allocation.
+        capacity = len(self._ring)
+        first = min(n, capacity - self._head)
+        ring = memoryview(self._ring)
+        if first == n and not padding:
+            data = bytes(ring[self._head:self._head + n])
+        else:
+            data = b"".join((ring[self._head:self._head + first], ring[:n - first], padding))
+        self._head = (self._head + n) % capacity
+        self._size -= n
+        audio_path_stats["callback_copies"] += 1
+        return data
+
+    def read(self, size: int) -> bytes:
+        with self._cond:
+            if len(self._silence) != size:
+                self._silence = bytes(size)
+            if not self.primed:
+                if self._size < self.target_bytes and not (self.draining and self._size):
+                    return self._silence
+                self.primed = True
+            available = self._size
+            if available >= size:
+                data = self._take(size)
+            else:
+                data = self._take(available, self._silence[available:])
+                if not self.draining:
+                    self.underruns += 1
+                    audio_path_stats["underruns"] += 1
+                self.primed = False
+            self._cond.notify_all()
+            return data
+
+    def finish(self):
+        """
+        No more data is coming: play out the remainder without waiting for target depth.
+        """
+        with self._cond:
+            self.draining = True
+
+    def wait_empty(self, timeout: float) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._size or not self.active, timeout)
+
+    def flush(self):
+        with self._cond:
+            self._clear()
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self.active = False
+            self._clear()
+            self._cond.notify_all()
+
+
 class AudioPlayer:
+    """
+    Callback-mode PyAudio output fed from a JitterBuffer. write_audio() only
+    enqueues, so stop_stream()/flush() never wait behind a blocking write.
+    """
     def __init__(self, pyaudio_instance, playback_rate=24000, channels=1, format=pyaudio.paInt16):
         self.pyaudio = pyaudio_instance
         self.playback_rate = playback_rate
@@ -164,44 +524,314 @@ class AudioPlayer:
         self.stream = None
         self.lock = threading.Lock()
         self.is_playing = False
+        self.last_stopped_at: Optional[float] = None
+
+        playback_config = CONFIG["AUDIO_PLAYBACK_CONFIG"]
+        self.frames_per_buffer = playback_config["FRAMES_PER_BUFFER"]
+        self.frame_bytes = channels * pyaudio.get_sample_size(format)
+        bytes_per_ms = playback_rate * self.frame_bytes / 1000
+        self.jitter = JitterBuffer(
+            target_bytes=int(playback_config["JITTER_TARGET_MS"] * bytes_per_ms) // self.frame_bytes * self.frame_bytes,
+            max_bytes=int(playback_config["JITTER_MAX_MS"] * bytes_per_ms) // self.frame_bytes * self.frame_bytes,
+        )
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        return self.jitter.read(frame_count * self.frame_bytes), pyaudio.paContinue
 
     def start_stream(self):
         with self.lock:
             if not self.is_playing:
+                self.jitter.reset()
                 self.stream = self.pyaudio.open(
                     format=self.format,
                     channels=self.channels,
                     rate=self.playback_rate,
                     output=True,
-                    frames_per_buffer=1024
+                    frames_per_buffer=self.frames_per_buffer,
+                    stream_callback=self._callback
                 )
                 self.is_playing = True
                 print("Audio stream started.")
 
     def stop_stream(self):
+        self.jitter.close()
         with self.lock:
             if self.stream and self.is_playing:
                 self.stream.stop_stream()
                 self.stream.close()
                 self.stream = None
                 self.is_playing = False
+                self.last_stopped_at = time.perf_counter()
                 print("Audio stream stopped.")
 
     def write_audio(self, data: bytes):
-        with self.lock:
-            if self.stream and self.is_playing:
-                self.stream.write(data)
+        if self.is_playing:
+            self.jitter.write(data)
 
+    def drain(self, timeout: float = 30.0):
+        """
+        Blocks until everything written so far has been handed to PyAudio.
+        """
+        self.jitter.finish()
+        self.jitter.wait_empty(timeout)
 
-audio_player = AudioPlayer(pyaudio_instance)
+    def flush(self):
+        """
+        Drops buffered audio immediately; the callback plays silence from the next period.
+        """
+        self.jitter.flush()
 
-# =========== Global Stop Events ===========
-TTS_STOP_EVENT = asyncio.Event()
-GEN_STOP_EVENT = asyncio.Event()
 
-# =========== WebSocket Connections ===========
-from fastapi import WebSocket
+# =========== Playback Buffers ===========
+class PcmSegment:
+    """
+    One phrase worth of PCM in a preallocated bytearray ring.
+    Writers (the Azure SDK thread, or the event loop for OpenAI) copy straight
+    from their memoryview into the ring; the playback thread reads it out.
+    Neither side touches the event loop per chunk.
+    """
+    def __init__(self, owner: "PlaybackQueue", capacity: int, on_consumed: Optional[Callable[[], None]] = None):
+        self._owner = owner
+        self._buffer = bytearray(capacity)
+        # Called once, from the playback thread, when the player has finished the segment
+        self.on_consumed = on_consumed
+        self._head = 0
+        self._size = 0
+        self.closed = False
+        audio_path_stats["buffer_allocations"] += 1
+
+    def write(self, data) -> int:
+        view = memoryview(data).cast("B")
+        n = len(view)
+        with self._owner._cond:
+            if self.closed or self._owner.aborted:
+                return 0
+            if self._size + n > len(self._buffer):
+                self._grow(self._size + n)
+            capacity = len(self._buffer)
+            tail = (self._head + self._size) % capacity
+            first = min(n, capacity - tail)
+            self._buffer[tail:tail + first] = view[:first]
+            self._buffer[:n - first] = view[first:]
+            self._size += n
+            audio_path_stats["chunks_in"] += 1
+            audio_path_stats["bytes_in"] += n
+            self._owner._cond.notify_all()
+        return n
+
+    def close(self):
+        with self._owner._cond:
+            self.closed = True
+            self._owner._cond.notify_all()
+
+    def _grow(self, needed: int):
+        # Caller holds the lock. Rare: only when a phrase outgrows SEGMENT_BUFFER_BYTES.
+        size = self._size
+        new_buffer = bytearray(max(len(self._buffer) * 2, needed))
+        new_buffer[:size] = self._take(size)
+        self._buffer = new_buffer
+        self._head = 0
+        self._size = size
+        audio_path_stats["buffer_grows"] += 1
+
+    def _take(self, n: int) -> bytes:
+        # Caller holds the lock.
+        capacity = len(self._buffer)
+        first = min(n, capacity - self._head)
+        view = memoryview(self._buffer)
+        if first == n:
+            data = bytes(view[self._head:self._head + n])
+        else:
+            data = b"".join((view[self._head:capacity], view[:n - first]))
+        self._head = (self._head + n) % capacity
+        self._size -= n
+        return data
 
+
+class PlaybackQueue:
+    """
+    Thread-safe, ordered chain of PcmSegments consumed by the playback thread.
+
+    Producers either open a segment per phrase (open_segment, in phrase order,
+    so concurrent synthesis still plays in order) or write loose chunks with
+    write(). A segment's on_consumed callback runs once it has been played
+    (or dropped by abort()). end() marks the end of the turn; abort() drops
+    everything and wakes the reader immediately.
+    """
+    def __init__(self, segment_capacity: Optional[int] = None):
+        self.segment_capacity = segment_capacity or CONFIG["AUDIO_PLAYBACK_CONFIG"]["SEGMENT_BUFFER_BYTES"]
+        self._cond = threading.Condition(threading.RLock())
+        self._segments: deque = deque()
+        self._loose: Optional[PcmSegment] = None
+        self.ended = False
+        self.aborted = False
+        # Set by start_recording(): everything the playback thread reads is copied here
+        self.recording: Optional[bytearray] = None
+        # One queue per turn, so this is when the turn's audio path was set up
+        self.created_at = time.perf_counter()
+
+    def buffered_bytes(self) -> int:
+        with self._cond:
+            return sum(segment._size for segment in self._segments)
+
+    def start_recording(self):
+        with self._cond:
+            self.recording = bytearray()
+
+    def open_segment(self, on_consumed: Optional[Callable[[], None]] = None) -> PcmSegment:
+        with self._cond:
+            if self._loose is not None:
+                self._loose.close()
+                self._loose = None
+            segment = PcmSegment(self, self.segment_capacity, on_consumed)
+            if self.aborted:
+                # Nobody will read it: hand it back already closed and consumed
+                segment.closed = True
+                self._consumed(segment)
+                return segment
+            self._segments.append(segment)
+            return segment
+
+    def write(self, data) -> int:
+        with self._cond:
+            if self.ended or self.aborted:
+                return 0
+            if self._loose is None:
+                self._loose = PcmSegment(self, self.segment_capacity)
+                self._segments.append(self._loose)
+            return self._loose.write(data)
+
+    def end(self):
+        with self._cond:
+            self.ended = True
+            if self._loose is not None:
+                self._loose.close()
+                self._loose = None
+            self._cond.notify_all()
+
+    def abort(self):
+        with self._cond:
+            self.aborted = True
+            for segment in self._segments:
+                self._consumed(segment)
+            self._segments.clear()
+            self._cond.notify_all()
+
+    @staticmethod
+    def _consumed(segment: PcmSegment):
+        callback, segment.on_consumed = segment.on_consumed, None
+        if callback is not None:
+            callback()
+
+    def read(self, max_bytes: int) -> Optional[bytes]:
+        """
+        Blocks (playback thread) until audio is available.
+        Returns None once the turn has ended and everything was played, or on abort.
+        """
+        with self._cond:
+            while True:
+                if self.aborted:
+                    return None
+                if self._segments:
+                    segment = self._segments[0]
+                    if segment._size:
+                        audio_path_stats["chunks_out"] += 1
+                        data = segment._take(min(max_bytes, segment._size))
+                        if self.recording is not None:
+                            self.recording += data
+                        return data
+                    if segment.closed:
+                        self._segments.popleft()
+                        self._consumed(segment)
+                        continue
+                elif self.ended:
+                    return None
+                self._cond.wait()
+
+
+# =========== Chat Sessions ===========
+class ChatSession:
+    """
+    Owns everything one /ws/chat client needs to run a conversation:
+    its own stop events, phrase/audio queues, audio player and the
+    currently running generation task. Sessions never share stop events,
+    so stopping one room does not cancel another.
+    """
+    def __init__(self, websocket: WebSocket):
+        self.session_id = uuid.uuid4().hex
+        self.websocket = websocket
+        self.tts_stop_event = asyncio.Event()
+        self.gen_stop_event = asyncio.Event()
+        self.phrase_queue: Optional[asyncio.Queue] = None
+        self.audio_queue: Optional[PlaybackQueue] = None
+        self.audio_player = AudioPlayer(pyaudio_instance)
+        self.generation_task: Optional[asyncio.Task] = None
+        # perf_counter() of the wake word that interrupted this turn, if any
+        self.barge_in_at: Optional[float] = None
+        # perf_counter() of the first stop_tts() of this turn, if any
+        self.stop_requested_at: Optional[float] = None
+
+    @property
+    def is_busy(self) -> bool:
+        return self.generation_task is not None and not self.generation_task.done()
+
+    def reset_pipeline(self):
+        """
+        Clears old stop events and creates fresh queues for a new chat turn.
+        """
+        self.tts_stop_event.clear()
+        self.gen_stop_event.clear()
+        self.barge_in_at = None
+        self.stop_requested_at = None
+        self.phrase_queue = asyncio.Queue()
+        self.audio_queue = PlaybackQueue()
+
+    def stop_tts(self):
+        if not self.tts_stop_event.is_set():
+            self.stop_requested_at = time.perf_counter()
+        self.tts_stop_event.set()
+        if self.audio_queue is not None:
+            # Wake the playback thread now instead of at its next chunk
+            self.audio_queue.abort()
+        self.audio_player.flush()
+
+    def stop_generation(self):
+        self.gen_stop_event.set()
+
+    async def cancel_generation(self):
+        """
+        Stops any in-flight generation + TTS and waits for the task to finish.
+        """
+        if self.is_busy:
+            self.stop_generation()
+            self.stop_tts()
+            try:
+                await self.generation_task
+            except Exception as e:
+                conditional_print(f"Session {self.session_id} generation ended with error: {e}", "default")
+        self.generation_task = None
+
+
+chat_sessions: Dict[str, ChatSession] = {}
+
+
+def resolve_sessions(session_id: Optional[str]) -> List[ChatSession]:
+    """
+    Returns the session matching `session_id`, or every session when no id is given
+    (keeps the old "stop everything" behaviour for clients that don't send one).
+    """
+    if session_id is None:
+        return list(chat_sessions.values())
+    session = chat_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Unknown session '{session_id}'.")
+    return [session]
+
+
+def any_session_busy() -> bool:
+    return any(session.is_busy for session in chat_sessions.values())
+
+# =========== WebSocket Connections ===========
 connected_websockets: Set[WebSocket] = set()
 
 # ------------ Broadcast Helper ------------
@@ -228,18 +858,154 @@ def shutdown():
     Gracefully close streams, terminate PyAudio, etc.
     """
     print("Shutting down server...")
-    audio_player.stop_stream()
+    for session in list(chat_sessions.values()):
+        session.stop_tts()
+        session.stop_generation()
+        session.audio_player.stop_stream()
+    azure_synthesizer_pool.close()
+    microphone_bus.stop()
+    tool_executor.shutdown(wait=False, cancel_futures=True)
     PyAudioSingleton.terminate()
+    log_writer.close()
     print("Shutdown complete.")
 
 
+# =========== Shared Microphone Capture ===========
+class AudioRingBuffer:
+    """
+    Fixed-size byte ring written by one capture thread and read by any number
+    of readers, each tracking its own absolute position. A reader that falls
+    more than `capacity` bytes behind skips ahead to the oldest retained audio.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._cond = threading.Condition()
+        self.write_pos = 0  # total bytes ever written
+        self.overruns = 0
+        self.closed = False
+
+    def write(self, data: bytes):
+        view = memoryview(data)[-self.capacity:]
+        with self._cond:
+            start = (self.write_pos + len(data) - len(view)) % self.capacity
+            first = min(len(view), self.capacity - start)
+            self._buffer[start:start + first] = view[:first]
+            self._buffer[:len(view) - first] = view[first:]
+            self.write_pos += len(data)
+            self._cond.notify_all()
+
+    def read_from(self, position: int, size: int, timeout: Optional[float] = None) -> Tuple[Optional[bytes], int]:
+        """
+        Blocks until `size` bytes past `position` are available.
+        Returns (data, new_position); data is None once the buffer is closed
+        (or on timeout).
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.closed or self.write_pos - position >= size, timeout):
+                return None, position
+            if self.closed:
+                return None, position
+            if self.write_pos - position > self.capacity:
+                self.overruns += 1
+                position = self.write_pos - self.capacity
+            start = position % self.capacity
+            first = min(size, self.capacity - start)
+            data = bytes(self._buffer[start:start + first]) + bytes(self._buffer[:size - first])
+            return data, position + size
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class MicrophoneReader:
+    """
+    One consumer's cursor into the microphone ring buffer.
+    """
+    def __init__(self, ring: AudioRingBuffer, sample_width: int):
+        self.ring = ring
+        self.sample_width = sample_width
+        self.position = ring.write_pos
+
+    def read(self, frames: int, timeout: Optional[float] = None) -> Optional[bytes]:
+        data, self.position = self.ring.read_from(self.position, frames * self.sample_width, timeout)
+        return data
+
+
+class MicrophoneBus:
+    """
+    Single microphone capture thread writing 16-bit mono PCM into a ring
+    buffer. Consumers (wake word, STT, and anything else like VAD) call
+    subscribe() and read frames at their own pace.
+    """
+    SAMPLE_WIDTH = 2  # paInt16
+
+    def __init__(self, sample_rate: int, frames_per_buffer: int, ring_seconds: float):
+        self.sample_rate = sample_rate
+        self.frames_per_buffer = frames_per_buffer
+        self.ring = AudioRingBuffer(int(sample_rate * ring_seconds) * self.SAMPLE_WIDTH)
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def subscribe(self) -> MicrophoneReader:
+        return MicrophoneReader(self.ring, self.SAMPLE_WIDTH)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._capture, daemon=True)
+        self._thread.start()
+
+    def _capture(self):
+        stream = pyaudio_instance.open(
+            rate=self.sample_rate,
+            channels=1,
+            format=pyaudio.paInt16,
+            input=True,
+            frames_per_buffer=self.frames_per_buffer
+        )
+        print("[Microphone] Capture started.")
+        try:
+            while self._running:
+                self.ring.write(stream.read(self.frames_per_buffer, exception_on_overflow=False))
+        except Exception as e:
+            print(f"[Microphone] Capture error: {e}")
+        finally:
+            stream.close()
+            self.ring.close()
+            print("[Microphone] Capture stopped.")
+
+    def stop(self):
+        self._running = False
+        self.ring.close()
+
+
+microphone_bus = MicrophoneBus(
+    sample_rate=CONFIG["MICROPHONE"]["SAMPLE_RATE"],
+    frames_per_buffer=CONFIG["MICROPHONE"]["FRAMES_PER_BUFFER"],
+    ring_seconds=CONFIG["MICROPHONE"]["RING_BUFFER_SECONDS"],
+)
+
 # =========== Azure STT Class ===========
 class ContinuousSpeechRecognizer:
-    def __init__(self):
+    """
+    Azure continuous recognition. Final results are fanned out to one
+    asyncio.Queue per subscriber (websocket) straight from the SDK thread,
+    so nothing has to poll for recognized text.
+
+    Audio comes from the shared MicrophoneBus through a PushAudioInputStream
+    rather than a second capture of the default microphone.
+    """
+    def __init__(self, microphone: MicrophoneBus):
         self.speech_key = os.getenv('AZURE_SPEECH_KEY')
         self.speech_region = os.getenv('AZURE_SPEECH_REGION')
+        self.microphone = microphone
         self.is_listening = False
-        self.speech_queue = Queue()
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         self.setup_recognizer()
 
     def setup_recognizer(self):
@@ -252,16 +1018,56 @@ class ContinuousSpeechRecognizer:
         )
         speech_config.speech_recognition_language = "en-US"
 
-        audio_config = speechsdk.audio.AudioConfig(use_default_microphone=True)
+        stream_format = speechsdk.audio.AudioStreamFormat(
+            samples_per_second=self.microphone.sample_rate,
+            bits_per_sample=MicrophoneBus.SAMPLE_WIDTH * 8,
+            channels=1
+        )
+        self.push_stream = speechsdk.audio.PushAudioInputStream(stream_format=stream_format)
+        audio_config = speechsdk.audio.AudioConfig(stream=self.push_stream)
         self.speech_recognizer = speechsdk.SpeechRecognizer(
             speech_config=speech_config,
             audio_config=audio_config
         )
+        threading.Thread(target=self._pump_microphone, daemon=True).start()
         self.speech_recognizer.recognized.connect(self.handle_final_result)
 
     def handle_final_result(self, evt):
-        if evt.result.text and self.is_listening:
-            self.speech_queue.put(evt.result.text)
+        # Runs on the SDK's thread; hand the text to the event loop without blocking.
+        if evt.result.text and self.is_listening and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._publish, evt.result.text)
+
+    def _pump_microphone(self):
+        """
+        Forwards microphone frames into Azure while listening. When paused the
+        frames are dropped, so recognition never resumes on stale audio.
+        """
+        reader = self.microphone.subscribe()
+        push_frames = CONFIG["MICROPHONE"]["STT_PUSH_FRAMES"]
+        while True:
+            data = reader.read(push_frames)
+            if data is None:
+                break
+            if self.is_listening:
+                self.push_stream.write(data)
+        self.push_stream.close()
+
+    def _publish(self, text: str):
+        for subscriber in self._subscribers:
+            subscriber.put_nowait(text)
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Must be called from the event loop; returns a queue that receives
+        every recognized utterance from now on.
+        """
+        self._loop = asyncio.get_running_loop()
+        subscriber: asyncio.Queue = asyncio.Queue()
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: asyncio.Queue):
+        self._subscribers.discard(subscriber)
 
     def start_listening(self):
         if not self.is_listening:
@@ -275,19 +1081,109 @@ class ContinuousSpeechRecognizer:
             self.speech_recognizer.stop_continuous_recognition()
             print("Azure STT: Paused listening.")
 
-    def get_speech_nowait(self):
-        try:
-            return self.speech_queue.get_nowait()
-        except:
-            return None
-
 
-stt_instance = ContinuousSpeechRecognizer()
+stt_instance = ContinuousSpeechRecognizer(microphone_bus)
 
 # =========== Tools & Function Calls ===========
+_JSON_SCHEMA_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean"}
+
+@lru_cache(maxsize=None)
+def cached_signature(function: Callable) -> inspect.Signature:
+    return inspect.signature(function)
+
+def json_schema_for_type(annotation: Any) -> Dict[str, Any]:
+    """
+    Maps a parameter type hint to a JSON schema fragment usable in strict mode.
+    """
+    if annotation in _JSON_SCHEMA_TYPES:
+        return {"type": _JSON_SCHEMA_TYPES[annotation]}
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is Literal:
+        return {"type": _JSON_SCHEMA_TYPES[type(args[0])], "enum": list(args)}
+    if origin in (list, List):
+        return {"type": "array", "items": json_schema_for_type(args[0] if args else str)}
+    if origin is Union and type(None) in args and len(args) == 2:
+        schema = json_schema_for_type(next(arg for arg in args if arg is not type(None)))
+        schema["type"] = [schema["type"], "null"]
+        return schema
+    raise TypeError(f"Unsupported tool parameter type: {annotation!r}")
+
+def build_tool_schema(function: Callable, name: str, description: str,
+                      param_descriptions: Mapping[str, str]) -> Dict[str, Any]:
+    """
+    Derives the strict function-calling schema from the function's signature
+    and type hints. Strict mode requires every parameter to be listed as required.
+    """
+    hints = typing.get_type_hints(function)
+    properties = {}
+    for param_name, param in cached_signature(function).parameters.items():
+        if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            raise TypeError(f"Tool '{name}' cannot take *args/**kwargs.")
+        if param_name not in hints:
+            raise TypeError(f"Tool '{name}' parameter '{param_name}' needs a type hint.")
+        prop = json_schema_for_type(hints[param_name])
+        if param_name in param_descriptions:
+            prop["description"] = param_descriptions[param_name]
+        properties[param_name] = prop
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "strict": True,
+            "parameters": {
+                "type": "object",
+                "required": list(properties),
+                "properties": properties,
+                "additionalProperties": False
+            }
+        }
+    }
+
+class ToolRegistry:
+    """
+    Tools register themselves once at import with @tool(...). Schemas are
+    derived from type hints at registration and the tools payload is built
+    once, so requests just reuse the same frozen tuple (and its JSON form).
+    """
+    def __init__(self):
+        self._functions: Dict[str, Callable] = {}
+        self._schemas: Dict[str, Dict[str, Any]] = {}
+        self._payload: Optional[Tuple[Dict[str, Any], ...]] = None
+        self._payload_json: Optional[str] = None
+
+    def register(self, description: str, params: Optional[Mapping[str, str]] = None,
+                 name: Optional[str] = None) -> Callable[[Callable], Callable]:
+        def decorator(function: Callable) -> Callable:
+            tool_name = name or function.__name__
+            self._functions[tool_name] = function
+            self._schemas[tool_name] = build_tool_schema(function, tool_name, description, params or {})
+            self._payload = None
+            self._payload_json = None
+            return function
+        return decorator
+
+    @property
+    def functions(self) -> Mapping[str, Callable]:
+        return MappingProxyType(self._functions)
+
+    def tools_payload(self) -> Tuple[Dict[str, Any], ...]:
+        if self._payload is None:
+            self._payload = tuple(self._schemas[tool_name] for tool_name in self._functions)
+            self._payload_json = json.dumps(self._payload, separators=(",", ":"))
+        return self._payload
+
+    def tools_json(self) -> str:
+        self.tools_payload()
+        return self._payload_json
+
+
+tool_registry = ToolRegistry()
+tool = tool_registry.register
+
 def check_args(function: Callable, args: dict) -> bool:
-    sig = inspect.signature(function)
-    params = sig.parameters
+    params = cached_signature(function).parameters
     for name in args:
         if name not in params:
             return False
@@ -306,7 +1202,114 @@ def get_function_and_args(tool_call: dict, available_functions: dict) -> Tuple[C
         raise ValueError(f"Invalid arguments for function '{function_name}'")
     return function_to_call, function_args
 
-def fetch_weather(lat=28.5383, lon=-81.3792, exclude="minutely", units="metric", lang="en"):
+class AsyncTTLCache:
+    """
+    In-process result cache for async lookups: TTL expiry, LRU eviction and
+    single-flight (concurrent misses for the same key share one fetch).
+    Optionally persisted as JSON so entries survive a restart.
+    Keys must be tuples of JSON-serializable values.
+    """
+    def __init__(self, ttl_seconds: float, max_entries: int, persist_path: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self._entries: "OrderedDict[tuple, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        self._save_task: Optional[asyncio.Task] = None
+        self._save_again = False
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+        self._load()
+
+    async def get_or_fetch(self, key: tuple, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return value
+            del self._entries[key]
+
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            self.stats["misses"] += 1
+            # The fetch runs as its own task: a caller timing out (wait_for) only
+            # cancels its own wait, never the fetch other callers share.
+            inflight = asyncio.ensure_future(self._fetch(key, fetch))
+            # Mark retrieved so a failure nobody awaits doesn't log "exception never retrieved"
+            inflight.add_done_callback(lambda task: task.cancelled() or task.exception())
+            self._inflight[key] = inflight
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(inflight)
+
+    async def _fetch(self, key: tuple, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await fetch()
+        finally:
+            self._inflight.pop(key, None)
+        self._store(key, value)
+        return value
+
+    def _store(self, key: tuple, value: Any):
+        self._entries[key] = (time.time() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+        if self.persist_path:
+            self._schedule_save()
+
+    def _schedule_save(self):
+        # One save at a time; stores made while it runs are folded into one more save
+        if self._save_task is not None and not self._save_task.done():
+            self._save_again = True
+            return
+        self._save_task = asyncio.ensure_future(self._persist())
+
+    async def _persist(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._save_again = False
+            # Only a shallow copy on the loop; serializing happens on the worker thread
+            rows = list(self._entries.items())
+            await loop.run_in_executor(None, self._save, rows)
+            if not self._save_again:
+                break
+
+    def _save(self, rows: List[Tuple[tuple, Tuple[float, Any]]]):
+        # Worker thread
+        tmp_path = f"{self.persist_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            snapshot = json.dumps([[list(k), expires_at, v] for k, (expires_at, v) in rows])
+            with open(tmp_path, "w") as f:
+                f.write(snapshot)
+            os.replace(tmp_path, self.persist_path)
+        except (OSError, TypeError, ValueError) as e:
+            conditional_print(f"Could not persist cache to {self.persist_path}: {e}", "default")
+
+    def _load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path) as f:
+                rows = json.load(f)
+        except (OSError, ValueError) as e:
+            conditional_print(f"Ignoring unreadable cache file {self.persist_path}: {e}", "default")
+            return
+        now = time.time()
+        for key, expires_at, value in rows[-self.max_entries:]:
+            if expires_at > now:
+                self._entries[tuple(key)] = (expires_at, value)
+
+
+weather_cache = AsyncTTLCache(
+    ttl_seconds=CONFIG["TOOLS"]["WEATHER_CACHE"]["TTL_SECONDS"],
+    max_entries=CONFIG["TOOLS"]["WEATHER_CACHE"]["MAX_ENTRIES"],
+    persist_path=CONFIG["TOOLS"]["WEATHER_CACHE"]["PERSIST_PATH"],
+)
+
+def fetch_weather_uncached(lat, lon, exclude, units, lang):
     load_dotenv()
     api_key = os.getenv('OPENWEATHER_API_KEY')
     if not api_key:
@@ -318,9 +1321,61 @@ def fetch_weather(lat=28.5383, lon=-81.3792, exclude="minutely", units="metric",
     response.raise_for_status()
     return response.json()
 
-def get_time(lat=28.5383, lon=-81.3792):
-    tf = TimezoneFinder()
-    tz_name = tf.timezone_at(lat=lat, lng=lon)
+@tool(
+    "Fetch current weather and forecast data...",
+    params={
+        "lat": "Latitude...",
+        "lon": "Longitude...",
+        "exclude": "Data to exclude...",
+        "units": "Units of measurement...",
+        "lang": "Language of the response...",
+    }
+)
+async def fetch_weather(lat: float = 28.5383, lon: float = -81.3792, exclude: str = "minutely",
+                        units: str = "metric", lang: str = "en"):
+    """
+    Weather for a ~1 km bucket around (lat, lon), served from weather_cache
+    when fresh. Misses run the blocking HTTP call on tool_executor.
+    """
+    precision = CONFIG["TOOLS"]["WEATHER_CACHE"]["COORD_PRECISION"]
+    lat, lon = round(float(lat), precision), round(float(lon), precision)
+    key = (lat, lon, units, lang, exclude)
+
+    async def fetch():
+        return await asyncio.get_running_loop().run_in_executor(
+            tool_executor, fetch_weather_uncached, lat, lon, exclude, units, lang
+        )
+
+    return await weather_cache.get_or_fetch(key, fetch)
+
+_timezone_finder: Optional[TimezoneFinder] = None
+_timezone_finder_lock = threading.Lock()
+
+def get_timezone_finder() -> TimezoneFinder:
+    """
+    Process-wide TimezoneFinder; its polygon data is loaded once, on first use.
+    """
+    global _timezone_finder
+    if _timezone_finder is None:
+        with _timezone_finder_lock:
+            if _timezone_finder is None:
+                _timezone_finder = TimezoneFinder()
+    return _timezone_finder
+
+@lru_cache(maxsize=4096)
+def timezone_for_cell(lat_cell: float, lon_cell: float) -> Optional[str]:
+    """
+    Memoized grid-cell -> tz name index built lazily from TimezoneFinder lookups.
+    """
+    return get_timezone_finder().timezone_at(lat=lat_cell, lng=lon_cell)
+
+@tool(
+    "Fetch the current time based on location...",
+    params={"lat": "Latitude...", "lon": "Longitude..."}
+)
+def get_time(lat: float = 28.5383, lon: float = -81.3792):
+    precision = CONFIG["TOOLS"]["TIMEZONE_GRID_PRECISION"]
+    tz_name = timezone_for_cell(round(float(lat), precision), round(float(lon), precision))
     if not tz_name:
         raise ValueError("Time zone could not be determined for the given coordinates.")
     local_tz = pytz.timezone(tz_name)
@@ -328,58 +1383,160 @@ def get_time(lat=28.5383, lon=-81.3792):
     return local_time.strftime("%H:%M:%S")
 
 def get_tools():
-    return [
-        {
-            "type": "function",
-            "function": {
-                "name": "fetch_weather",
-                "description": "Fetch current weather and forecast data...",
-                "strict": True,
-                "parameters": {
-                    "type": "object",
-                    "required": ["lat", "lon", "exclude", "units", "lang"],
-                    "properties": {
-                        "lat": {"type": "number", "description": "Latitude..."},
-                        "lon": {"type": "number", "description": "Longitude..."},
-                        "exclude": {"type": "string", "description": "Data to exclude..."},
-                        "units": {"type": "string", "description": "Units of measurement..."},
-                        "lang": {"type": "string", "description": "Language of the response..."}
-                    },
-                    "additionalProperties": False
-                }
-            }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "get_time",
-                "description": "Fetch the current time based on location...",
-                "strict": True,
-                "parameters": {
-                    "type": "object",
-                    "required": ["lat", "lon"],
-                    "properties": {
-                        "lat": {"type": "number", "description": "Latitude..."},
-                        "lon": {"type": "number", "description": "Longitude..."}
-                    },
-                    "additionalProperties": False
-                }
-            }
-        }
-    ]
+    return tool_registry.tools_payload()
 
 def get_available_functions():
+    return tool_registry.functions
+
+# =========== Tool Runtime ===========
+tool_executor = ThreadPoolExecutor(
+    max_workers=CONFIG["TOOLS"]["MAX_WORKERS"],
+    thread_name_prefix="tool"
+)
+tool_latency_stats: Dict[str, Dict[str, float]] = {}
+
+def record_tool_latency(name: str, elapsed_ms: float, outcome: str):
+    stats = tool_latency_stats.setdefault(name, {
+        "calls": 0, "errors": 0, "timeouts": 0,
+        "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0,
+    })
+    stats["calls"] += 1
+    stats["total_ms"] += elapsed_ms
+    stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+    stats["last_ms"] = elapsed_ms
+    TOOL_CALL_SECONDS.labels(name, outcome).observe(elapsed_ms / 1000)
+    if outcome == "error":
+        stats["errors"] += 1
+    elif outcome == "timeout":
+        stats["timeouts"] += 1
+
+async def run_tool_call(tool_call: dict, available_functions: dict) -> Dict[str, Any]:
+    """
+    Runs one tool call and returns its "tool" message. Async tools are awaited
+    on the loop; sync tools run on tool_executor so they can't stall the
+    websockets or the TTS pipeline. Failures and timeouts are reported back
+    to the model as an error payload.
+    """
+    name = tool_call["function"]["name"]
+    timeout = CONFIG["TOOLS"]["TIMEOUT_SECONDS"]
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        fn, fn_args = get_function_and_args(tool_call, available_functions)
+        conditional_print(f"[Calling Function]: {fn.__name__}", "function_call")
+        conditional_print(f"[With Arguments]: {json.dumps(fn_args, indent=2)}", "function_call")
+
+        if inspect.iscoroutinefunction(fn):
+            pending = fn(**fn_args)
+        else:
+            pending = asyncio.get_running_loop().run_in_executor(tool_executor, partial(fn, **fn_args))
+        resp = await asyncio.wait_for(pending, timeout)
+        conditional_print(f"[Function Output]: {resp}", "function_call")
+        content = json.dumps(resp)
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        content = json.dumps({"error": f"Function '{name}' timed out after {timeout}s"})
+    except Exception as e:
+        outcome = "error"
+        content = json.dumps({"error": str(e)})
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        record_tool_latency(name, elapsed_ms, outcome)
+        conditional_print(f"[Function Timing]: {name} {outcome} in {elapsed_ms:.0f} ms", "function_call")
+
     return {
-        "fetch_weather": fetch_weather,
-        "get_time": get_time
+        "tool_call_id": tool_call["id"],
+        "role": "tool",
+        "name": name,
+        "content": content
     }
 
+class StreamingToolCalls:
+    """
+    Accumulates streamed tool_call deltas and starts each call as soon as its
+    arguments JSON object is complete, while the model is still streaming the
+    rest of the turn. Completeness is tracked incrementally: only the newly
+    arrived argument characters are scanned (brace depth outside strings).
+    """
+    def __init__(self, available_functions: Mapping[str, Callable]):
+        self.available_functions = available_functions
+        self.tool_calls: List[dict] = []
+        self._scan_state: List[dict] = []
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self.started_early = 0
+
+    def add(self, tc_chunk) -> None:
+        while len(self.tool_calls) <= tc_chunk.index:
+            self.tool_calls.append({"id": "", "type": "function", "function": {"name": "", "arguments": ""}})
+            self._scan_state.append({"depth": 0, "in_string": False, "escaped": False, "complete": False})
+
+        tc = self.tool_calls[tc_chunk.index]
+        if tc_chunk.id:
+            tc["id"] += tc_chunk.id
+        if tc_chunk.function and tc_chunk.function.name:
+            tc["function"]["name"] += tc_chunk.function.name
+        if tc_chunk.function and tc_chunk.function.arguments:
+            tc["function"]["arguments"] += tc_chunk.function.arguments
+            if self._scan(self._scan_state[tc_chunk.index], tc_chunk.function.arguments):
+                self._start(tc_chunk.index, early=True)
+
+    @staticmethod
+    def _scan(state: dict, fragment: str) -> bool:
+        """Advances the scanner over `fragment`; True once the top-level object closes."""
+        if state["complete"]:
+            return False
+        depth, in_string, escaped = state["depth"], state["in_string"], state["escaped"]
+        for ch in fragment:
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch in "{[":
+                depth += 1
+            elif ch in "}]":
+                depth -= 1
+                if depth == 0:
+                    state["complete"] = True
+                    break
+        state["depth"], state["in_string"], state["escaped"] = depth, in_string, escaped
+        return state["complete"]
+
+    def _start(self, index: int, early: bool = False) -> None:
+        tool_call = self.tool_calls[index]
+        if index in self._tasks or (early and not tool_call["function"]["name"]):
+            return
+        if early:
+            self.started_early += 1
+            conditional_print(f"[Tool Call Ready]: {tool_call['function']['name']} started mid-stream", "tool_call")
+        self._tasks[index] = asyncio.create_task(run_tool_call(tool_call, self.available_functions))
+
+    async def results(self) -> List[Dict[str, Any]]:
+        """Starts any call not yet running and returns the tool messages in call order."""
+        for index in range(len(self.tool_calls)):
+            self._start(index)
+        return list(await asyncio.gather(*(self._tasks[index] for index in range(len(self.tool_calls)))))
+
+    def cancel(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+
 # =========== Audio Player & TTS ===========
-def audio_player_sync(audio_queue: asyncio.Queue, loop: asyncio.AbstractEventLoop, stop_event: asyncio.Event):
+def audio_player_sync(audio_queue: PlaybackQueue,
+                      stop_event: asyncio.Event,
+                      audio_player: AudioPlayer):
     """
-    Blocks on an asyncio.Queue in a background thread and plays PCM data.
+    Runs in a background thread and plays PCM data from the session's
+    PlaybackQueue through its AudioPlayer. Reads block on the queue's
+    condition variable, so there is no event-loop round-trip per chunk.
     Checks `stop_event.is_set()` for an early stop.
     """
+    chunk_bytes = CONFIG["AUDIO_PLAYBACK_CONFIG"]["PLAYBACK_CHUNK_BYTES"]
+    playback_started_at: Optional[float] = None
     try:
         audio_player.start_stream()
         while True:
@@ -387,13 +1544,18 @@ def audio_player_sync(audio_queue: asyncio.Queue, loop: asyncio.AbstractEventLoo
                 print("TTS stop_event is set. Audio player will stop.")
                 return
 
-            future = asyncio.run_coroutine_threadsafe(audio_queue.get(), loop)
-            audio_data = future.result()
+            audio_data = audio_queue.read(chunk_bytes)
 
             if audio_data is None:
-                print("audio_player_sync received None (end of TTS).")
+                print("audio_player_sync reached end of TTS audio.")
+                if not stop_event.is_set():
+                    audio_player.drain()
                 return
 
+            if playback_started_at is None:
+                playback_started_at = time.perf_counter()
+                observe_stage("first_audio", playback_started_at - audio_queue.created_at)
+
             try:
                 audio_player.write_audio(audio_data)
             except Exception as e:
@@ -403,25 +1565,34 @@ def audio_player_sync(audio_queue: asyncio.Queue, loop: asyncio.AbstractEventLoo
         print(f"audio_player_sync encountered an error: {e}")
     finally:
         audio_player.stop_stream()
+        # Nothing reads past this point; release producers waiting on playback
+        audio_queue.abort()
+        if playback_started_at is not None:
+            observe_stage("playback", time.perf_counter() - playback_started_at)
 
-async def start_audio_player_async(audio_queue: asyncio.Queue, loop: asyncio.AbstractEventLoop, stop_event: asyncio.Event):
-    await asyncio.to_thread(audio_player_sync, audio_queue, loop, stop_event)
+async def start_audio_player_async(audio_queue: PlaybackQueue,
+                                   stop_event: asyncio.Event,
+                                   audio_player: AudioPlayer):
+    await asyncio.to_thread(audio_player_sync, audio_queue, stop_event, audio_player)
 
 class PushAudioOutputStreamCallback(speechsdk.audio.PushAudioOutputStreamCallback):
-    def __init__(self, audio_queue: asyncio.Queue, stop_event: asyncio.Event):
+    """
+    Copies synthesized PCM from the Azure SDK thread straight into a
+    PcmSegment (no tobytes(), no event-loop hop).
+    The end of a phrase is signalled by the synthesizing task, not by close().
+    """
+    def __init__(self, segment: PcmSegment, stop_event: asyncio.Event):
         super().__init__()
-        self.audio_queue = audio_queue
+        self.segment = segment
         self.stop_event = stop_event
-        self.loop = asyncio.get_event_loop()
 
     def write(self, data: memoryview) -> int:
         if self.stop_event.is_set():
             return 0
-        self.loop.call_soon_threadsafe(self.audio_queue.put_nowait, data.tobytes())
-        return len(data)
+        return self.segment.write(data)
 
     def close(self):
-        self.loop.call_soon_threadsafe(self.audio_queue.put_nowait, None)
+        pass
 
 def create_ssml(phrase: str, voice: str, prosody: dict) -> str:
     return f"""
@@ -434,69 +1605,597 @@ def create_ssml(phrase: str, voice: str, prosody: dict) -> str:
 </speak>
 """
 
-async def azure_text_to_speech_processor(phrase_queue: asyncio.Queue,
-                                         audio_queue: asyncio.Queue,
-                                         stop_event: asyncio.Event):
+class WarmSynthesizer:
     """
-    Continuously read text from phrase_queue, convert to speech with Azure TTS,
-    and push PCM data into audio_queue. Stops early if stop_event is set.
+    A SpeechSynthesizer that is reused across phrases. Audio is streamed out
+    through the `synthesizing` event to whichever sink is currently attached,
+    so one pre-connected synthesizer can serve many phrases.
     """
-    try:
+    def __init__(self, speech_config: speechsdk.SpeechConfig):
+        self.synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
+        self.connection = speechsdk.Connection.from_speech_synthesizer(self.synthesizer)
+        self.sink: Optional[PushAudioOutputStreamCallback] = None
+        self.handshake_ms = 0.0
+        self._connected = threading.Event()
+        self.connection.connected.connect(lambda evt: self._connected.set())
+        self.connection.disconnected.connect(lambda evt: self._connected.clear())
+        self.synthesizer.synthesizing.connect(self._on_synthesizing)
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected.is_set()
+
+    def warm_up(self, timeout: float = 5.0):
+        """
+        Blocking: opens the service connection ahead of time and records how
+        long the handshake took.
+        """
+        started = time.perf_counter()
+        self.connection.open(True)
+        if self._connected.wait(timeout):
+            self.handshake_ms = (time.perf_counter() - started) * 1000
+
+    def _on_synthesizing(self, evt):
+        sink = self.sink
+        if sink is not None:
+            sink.write(memoryview(evt.result.audio_data))
+
+    def close(self):
+        try:
+            self.connection.close()
+        except Exception as e:
+            conditional_print(f"Error closing Azure TTS connection: {e}", "default")
+
+
+class AzureSynthesizerPool:
+    """
+    Keeps SYNTHESIZER_POOL_SIZE pre-connected synthesizers alive between chats
+    so phrases don't pay a fresh TLS/websocket handshake. If every warm
+    synthesizer is busy, a cold one is created on demand.
+    """
+    def __init__(self):
+        self.speech_config: Optional[speechsdk.SpeechConfig] = None
+        self.size = 0
+        self._idle: List[WarmSynthesizer] = []
+        self.stats = {
+            "warm_phrases": 0,
+            "cold_phrases": 0,
+            "handshake_ms_saved_total": 0.0,
+            "last_phrase_handshake_ms_saved": 0.0,
+        }
+
+    def _ensure_config(self):
+        if self.speech_config is not None:
+            return
         speech_config = speechsdk.SpeechConfig(
             subscription=os.getenv("AZURE_SPEECH_KEY"),
             region=os.getenv("AZURE_SPEECH_REGION")
         )
-        prosody = CONFIG["TTS_MODELS"]["AZURE_TTS"]["PROSODY"]
-        voice = CONFIG["TTS_MODELS"]["AZURE_TTS"]["TTS_VOICE"]
         audio_format = getattr(
             speechsdk.SpeechSynthesisOutputFormat,
             CONFIG["TTS_MODELS"]["AZURE_TTS"]["AUDIO_FORMAT"]
         )
         speech_config.set_speech_synthesis_output_format(audio_format)
-        conditional_print("Azure TTS configured successfully.", "default")
+        self.speech_config = speech_config
+        self.size = CONFIG["TTS_MODELS"]["AZURE_TTS"]["SYNTHESIZER_POOL_SIZE"]
+
+    def _create_warm(self) -> WarmSynthesizer:
+        synth = WarmSynthesizer(self.speech_config)
+        synth.warm_up()
+        return synth
+
+    async def start(self):
+        """
+        Opens SYNTHESIZER_POOL_SIZE connections concurrently.
+        """
+        self._ensure_config()
+        loop = asyncio.get_running_loop()
+        missing = self.size - len(self._idle)
+        synths = await asyncio.gather(
+            *(loop.run_in_executor(None, self._create_warm) for _ in range(missing)),
+            return_exceptions=True
+        )
+        for synth in synths:
+            if isinstance(synth, Exception):
+                conditional_print(f"Azure TTS pre-warm failed: {synth}", "default")
+            else:
+                self._idle.append(synth)
+        handshakes = ", ".join(f"{synth.handshake_ms:.0f}" for synth in self._idle)
+        conditional_print(f"Azure TTS pool warmed {len(self._idle)} synthesizer(s); handshakes ms: [{handshakes}]", "default")
+
+    def acquire(self) -> WarmSynthesizer:
+        self._ensure_config()
+        # Most recently released first, skipping any whose idle connection the service dropped
+        for index in range(len(self._idle) - 1, -1, -1):
+            if self._idle[index].is_connected:
+                synth = self._idle.pop(index)
+                self.stats["warm_phrases"] += 1
+                self.stats["handshake_ms_saved_total"] += synth.handshake_ms
+                self.stats["last_phrase_handshake_ms_saved"] = synth.handshake_ms
+                return synth
+        self.stats["cold_phrases"] += 1
+        self.stats["last_phrase_handshake_ms_saved"] = 0.0
+        if self._idle:
+            # None still connected: reuse a disconnected one and pay the handshake
+            return self._idle.pop()
+        return WarmSynthesizer(self.speech_config)
+
+    def release(self, synth: WarmSynthesizer):
+        synth.sink = None
+        if len(self._idle) < self.size:
+            if not synth.is_connected:
+                # Reconnect in the background so the next phrase finds it warm
+                asyncio.get_running_loop().run_in_executor(None, synth.warm_up)
+            self._idle.append(synth)
+        else:
+            synth.close()
+
+    def recycle_after(self, synth: WarmSynthesizer, result_future, loop: asyncio.AbstractEventLoop):
+        """
+        Blocking: stops an abandoned synthesis and only then hands the
+        synthesizer back, so its leftover audio can't leak into another phrase.
+        """
+        synth.sink = None
+        try:
+            synth.synthesizer.stop_speaking_async().get()
+            result_future.get()
+        except Exception as e:
+            conditional_print(f"Azure TTS error while recycling synthesizer: {e}", "default")
+        loop.call_soon_threadsafe(self.release, synth)
+
+    def close(self):
+        for synth in self._idle:
+            synth.close()
+        self._idle.clear()
+
+
+azure_synthesizer_pool = AzureSynthesizerPool()
+
+async def azure_synthesize_phrase(phrase: str,
+                                  voice: str,
+                                  prosody: dict,
+                                  phrase_audio: PcmSegment,
+                                  stop_event: asyncio.Event) -> bool:
+    """
+    Synthesizes a single phrase into its own PcmSegment using a pooled,
+    pre-connected synthesizer. Returns True if the phrase completed.
+    The caller closes the segment once the task is done.
+    """
+    loop = asyncio.get_running_loop()
+    synth: Optional[WarmSynthesizer] = None
+    result_future = None
+    try:
+        synth = azure_synthesizer_pool.acquire()
+        saved_ms = azure_synthesizer_pool.stats["last_phrase_handshake_ms_saved"]
+        synth.sink = PushAudioOutputStreamCallback(phrase_audio, stop_event)
+        ssml_phrase = create_ssml(phrase, voice, prosody)
+        result_future = synth.synthesizer.speak_ssml_async(ssml_phrase)
+        conditional_print(
+            f"Azure TTS synthesizing phrase (handshake saved: {saved_ms:.0f} ms): {phrase}", "default"
+        )
+        result = await loop.run_in_executor(None, result_future.get)
+        completed = result.reason != speechsdk.ResultReason.Canceled
+        if not completed:
+            details = result.cancellation_details
+            conditional_print(f"Azure TTS synthesis canceled: {details.reason} {details.error_details}", "default")
+        else:
+            conditional_print("Azure TTS synthesis completed.", "default")
+        azure_synthesizer_pool.release(synth)
+        return completed
+    except asyncio.CancelledError:
+        if synth is not None:
+            if result_future is None:
+                azure_synthesizer_pool.release(synth)
+            else:
+                loop.run_in_executor(None, azure_synthesizer_pool.recycle_after, synth, result_future, loop)
+        raise
+    except Exception as e:
+        conditional_print(f"Azure TTS error: {e}", "default")
+        if synth is not None:
+            synth.close()
+        return False
+
+# =========== TTS Phrase Audio Cache ===========
+class RecordingSink:
+    """
+    Forwards writes to a PcmSegment / PlaybackQueue and keeps a copy, so a
+    freshly synthesized phrase can be cached once it completes.
+    """
+    def __init__(self, target: Union[PcmSegment, PlaybackQueue]):
+        self.target = target
+        self.data = bytearray()
+
+    def write(self, data) -> int:
+        self.data += data
+        return self.target.write(data)
+
+class TimingSink:
+    """
+    Forwards writes and notes when the first byte of a TTS request arrived.
+    """
+    def __init__(self, target):
+        self.target = target
+        self.first_write_at: Optional[float] = None
+
+    def write(self, data) -> int:
+        if self.first_write_at is None:
+            self.first_write_at = time.perf_counter()
+        return self.target.write(data)
+
+def with_tts_request_timing(synthesize_phrase: Callable[[str, Any], Awaitable[bool]],
+                            provider_name: str) -> Callable[[str, Any], Awaitable[bool]]:
+    """
+    Wraps a provider's per-phrase synthesis so each real TTS request is timed
+    in TTS_REQUEST_SECONDS. Applied inside with_phrase_audio_cache, so phrases
+    served from the cache are never counted as requests.
+    """
+    async def synthesize_timed(phrase: str, phrase_audio) -> bool:
+        sink = TimingSink(phrase_audio)
+        started_at = time.perf_counter()
+        completed = await synthesize_phrase(phrase, sink)
+        if sink.first_write_at is not None:
+            TTS_REQUEST_SECONDS.labels(provider_name, "first_byte").observe(sink.first_write_at - started_at)
+        if completed:
+            TTS_REQUEST_SECONDS.labels(provider_name, "total").observe(time.perf_counter() - started_at)
+        return completed
+
+    return synthesize_timed
+
+class PhraseAudioCache:
+    """
+    Content-addressed cache of synthesized phrase audio, keyed by a hash of
+    (provider, voice, prosody/speed, format, normalized text).
+
+    Two tiers, each with a byte cap and LRU eviction: an in-memory dict of
+    bytes, and a directory of raw PCM files (disk hits are promoted to
+    memory). The disk tier survives restarts; its LRU order comes from file
+    mtimes. Disk I/O runs off the event loop.
+    """
+    def __init__(self, memory_max_bytes: int, disk_dir: Optional[str], disk_max_bytes: int):
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0,
+                      "memory_evictions": 0, "disk_evictions": 0}
+        self._load_disk_index()
+
+    @staticmethod
+    def key(provider: str, voice: str, style: Any, audio_format: str, text: str) -> str:
+        normalized = " ".join(unicodedata.normalize("NFKC", text).split())
+        material = json.dumps([provider, voice, style, audio_format, normalized], sort_keys=True, default=str)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.pcm")
+
+    def _load_disk_index(self):
+        if not self.disk_dir:
+            return
+        os.makedirs(self.disk_dir, exist_ok=True)
+        files = []
+        with os.scandir(self.disk_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(".pcm") and entry.is_file():
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _remember(self, key: str, data: bytes):
+        if len(data) > self.memory_max_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.stats["memory_evictions"] += 1
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        # Worker thread
+        path = self._path(key)
+        try:
+            # Hits are promoted to memory as bytes anyway, so one plain read is all it takes
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            data = None
+        if not data:
+            # Missing or truncated to nothing: drop it from the index
+            with self._disk_lock:
+                size = self._disk.pop(key, None)
+                if size is not None:
+                    self._disk_bytes -= size
+            return None
+        with self._disk_lock:
+            if key in self._disk:
+                self._disk.move_to_end(key)
+        return data
+
+    def _write_disk(self, key: str, data: bytes):
+        # Worker thread
+        path = self._path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            conditional_print(f"TTS cache write failed: {e}", "default")
+            return
+        with self._disk_lock:
+            self._disk_bytes += len(data) - self._disk.pop(key, 0)
+            self._disk[key] = len(data)
+            self._evict_disk()
+
+    def _evict_disk(self):
+        # Caller holds _disk_lock (or is __init__)
+        while self._disk_bytes > self.disk_max_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self.stats["disk_evictions"] += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    async def play(self, key: str, sink: Union[PcmSegment, PlaybackQueue]) -> bool:
+        """
+        Writes a cached phrase straight into `sink`. False on a miss.
+        """
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+        elif self.disk_dir and key in self._disk:
+            data = await asyncio.to_thread(self._read_disk, key)
+            if data is not None:
+                self.stats["disk_hits"] += 1
+                self._remember(key, data)
+        if data is None:
+            self.stats["misses"] += 1
+            return False
+        sink.write(data)
+        return True
+
+    def store(self, key: str, data: bytes):
+        """
+        Adds a phrase to memory now and to disk in the background.
+        """
+        if not data:
+            return
+        self._remember(key, data)
+        self.stats["stores"] += 1
+        if self.disk_dir and len(data) <= self.disk_max_bytes:
+            asyncio.get_running_loop().run_in_executor(None, self._write_disk, key, data)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+        }
 
+_phrase_audio_cache: Optional[PhraseAudioCache] = None
+
+def get_phrase_audio_cache() -> PhraseAudioCache:
+    """
+    Process-wide PhraseAudioCache; its disk directory is created and indexed
+    on first use, so nothing touches the disk while the cache is disabled.
+    """
+    global _phrase_audio_cache
+    if _phrase_audio_cache is None:
+        settings = CONFIG["GENERAL_TTS"]["AUDIO_CACHE"]
+        _phrase_audio_cache = PhraseAudioCache(
+            settings["MEMORY_MAX_BYTES"],
+            settings["DISK_DIR"],
+            settings["DISK_MAX_BYTES"],
+        )
+    return _phrase_audio_cache
+
+def with_phrase_audio_cache(synthesize_phrase: Callable[[str, Any], Awaitable[bool]],
+                            stop_event: asyncio.Event,
+                            provider: str,
+                            voice: str,
+                            style: Any,
+                            audio_format: str) -> Callable[[str, Any], Awaitable[bool]]:
+    """
+    Wraps a provider's per-phrase synthesis with the phrase audio cache: short
+    phrases that were synthesized before are written to the sink with no
+    network call; misses are recorded
+    and cached if they complete unstopped.
+    """
+    settings = CONFIG["GENERAL_TTS"]["AUDIO_CACHE"]
+    if not settings["ENABLED"]:
+        return synthesize_phrase
+    phrase_audio_cache = get_phrase_audio_cache()
+
+    async def synthesize_cached(phrase: str, phrase_audio) -> bool:
+        if len(phrase) > settings["MAX_PHRASE_CHARS"]:
+            return await synthesize_phrase(phrase, phrase_audio)
+        key = phrase_audio_cache.key(provider, voice, style, audio_format, phrase)
+        if await phrase_audio_cache.play(key, phrase_audio):
+            conditional_print(f"TTS cache hit: {phrase}", "default")
+            return True
+        recorder = RecordingSink(phrase_audio)
+        completed = await synthesize_phrase(phrase, recorder)
+        if completed and not stop_event.is_set():
+            phrase_audio_cache.store(key, bytes(recorder.data))
+        return completed
+
+    return synthesize_cached
+
+async def synthesize_with_lookahead(phrase_queue: asyncio.Queue,
+                                    audio_queue: PlaybackQueue,
+                                    stop_event: asyncio.Event,
+                                    lookahead: int,
+                                    synthesize_phrase: Callable[[str, PcmSegment], Awaitable[bool]],
+                                    provider_name: str):
+    """
+    Shared look-ahead driver for the TTS processors.
+
+    Each phrase gets a PcmSegment, opened on audio_queue in phrase order, and
+    its own task that fills it via `synthesize_phrase(phrase, segment)`. The
+    playback thread consumes segments in that order. A phrase's slot is only
+    freed once the player has finished its segment, so synthesis never runs
+    more than `lookahead` phrases ahead of the one being played.
+    Setting stop_event cancels every pending task.
+    """
+    synth_tasks: Set[asyncio.Task] = set()
+    slots = asyncio.Semaphore(max(1, lookahead) + 1)
+    # on_consumed runs on the playback thread
+    release_slot = partial(asyncio.get_running_loop().call_soon_threadsafe, slots.release)
+
+    async def cancel_synthesis_on_stop():
+        await stop_event.wait()
+        for task in list(synth_tasks):
+            task.cancel()
+
+    def finish_phrase(task: asyncio.Task, segment: PcmSegment):
+        synth_tasks.discard(task)
+        segment.close()
+
+    stop_watcher = asyncio.create_task(cancel_synthesis_on_stop())
+    try:
         while True:
             if stop_event.is_set():
-                conditional_print("Azure TTS stop_event is set. Exiting TTS loop.", "default")
-                await audio_queue.put(None)
-                return
+                conditional_print(f"{provider_name} TTS stop_event is set. Exiting TTS loop.", "default")
+                break
 
             phrase = await phrase_queue.get()
-            if phrase is None or phrase.strip() == "":
-                await audio_queue.put(None)
-                conditional_print("Azure TTS received stop signal (None).", "default")
-                return
+            if phrase is None:
+                conditional_print(f"{provider_name} TTS received stop signal (None).", "default")
+                break
+            if stop_event.is_set():
+                break
+            if not phrase.strip():
+                continue
 
-            try:
-                ssml_phrase = create_ssml(phrase, voice, prosody)
-                push_stream_callback = PushAudioOutputStreamCallback(audio_queue, stop_event)
-                push_stream = speechsdk.audio.PushAudioOutputStream(push_stream_callback)
-                audio_cfg = speechsdk.audio.AudioOutputConfig(stream=push_stream)
+            # Blocks while `lookahead + 1` phrases are still waiting for (or in) playback
+            await slots.acquire()
+            if stop_event.is_set():
+                break
+            if audio_queue.aborted:
+                conditional_print(f"{provider_name} TTS: playback ended early. Exiting TTS loop.", "default")
+                break
+            segment = audio_queue.open_segment(on_consumed=release_slot)
+            task = asyncio.create_task(synthesize_phrase(phrase.strip(), segment))
+            synth_tasks.add(task)
+            # Runs even if the task is cancelled before it starts
+            task.add_done_callback(partial(finish_phrase, segment=segment))
 
-                synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=audio_cfg)
-                result_future = synthesizer.speak_ssml_async(ssml_phrase)
-                conditional_print(f"Azure TTS synthesizing phrase: {phrase}", "default")
-                await asyncio.get_event_loop().run_in_executor(None, result_future.get)
-                conditional_print("Azure TTS synthesis completed.", "default")
+        if synth_tasks:
+            await asyncio.wait(set(synth_tasks))
 
-            except Exception as e:
-                conditional_print(f"Azure TTS error: {e}", "default")
-                await audio_queue.put(None)
-                return
+    except Exception as e:
+        conditional_print(f"{provider_name} TTS error: {e}", "default")
+    finally:
+        stop_watcher.cancel()
+        for task in list(synth_tasks):
+            task.cancel()
+        audio_queue.end()
+
+async def azure_text_to_speech_processor(phrase_queue: asyncio.Queue,
+                                         audio_queue: PlaybackQueue,
+                                         stop_event: asyncio.Event):
+    """
+    Continuously read text from phrase_queue, convert to speech with Azure TTS,
+    and push PCM data into audio_queue. Stops early if stop_event is set.
 
+    Up to SYNTHESIS_LOOKAHEAD phrases are synthesized ahead of the one being
+    fed to audio_queue, so sentence round-trips overlap instead of queueing.
+    """
+    try:
+        prosody = CONFIG["TTS_MODELS"]["AZURE_TTS"]["PROSODY"]
+        voice = CONFIG["TTS_MODELS"]["AZURE_TTS"]["TTS_VOICE"]
+        lookahead = CONFIG["TTS_MODELS"]["AZURE_TTS"]["SYNTHESIS_LOOKAHEAD"]
+    except KeyError as e:
+        conditional_print(f"Missing Azure TTS config: {e}", "default")
+        audio_queue.end()
+        return
+
+    async def synthesize(phrase: str, phrase_audio: PcmSegment) -> bool:
+        return await azure_synthesize_phrase(phrase, voice, prosody, phrase_audio, stop_event)
+
+    synthesize = with_phrase_audio_cache(
+        with_tts_request_timing(synthesize, "Azure"), stop_event, "azure", voice,
+        {"prosody": prosody, "rate": CONFIG["TTS_MODELS"]["AZURE_TTS"]["SPEECH_SYNTHESIS_RATE"]},
+        CONFIG["TTS_MODELS"]["AZURE_TTS"]["AUDIO_FORMAT"],
+    )
+
+    await synthesize_with_lookahead(phrase_queue, audio_queue, stop_event, lookahead, synthesize, "Azure")
+
+_openai_tts_client: Optional[openai.AsyncOpenAI] = None
+
+def get_openai_tts_client() -> openai.AsyncOpenAI:
+    """
+    One process-wide client so every TTS request reuses the same HTTP connection pool.
+    """
+    global _openai_tts_client
+    if _openai_tts_client is None:
+        _openai_tts_client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _openai_tts_client
+
+async def openai_stream_phrase(openai_client: openai.AsyncOpenAI,
+                               phrase: str,
+                               phrase_audio: Union[PcmSegment, PlaybackQueue],
+                               stop_event: asyncio.Event,
+                               model: str,
+                               voice: str,
+                               speed: float,
+                               response_format: str,
+                               chunk_size: int) -> bool:
+    """
+    Streams one phrase from OpenAI TTS into `phrase_audio` (a per-phrase
+    segment, or audio_queue itself when not prefetching), followed by a
+    short silence. Returns True if the phrase completed. The caller closes/ends it.
+    """
+    try:
+        async with openai_client.audio.speech.with_streaming_response.create(
+            model=model,
+            voice=voice,
+            input=phrase,
+            speed=speed,
+            response_format=response_format
+        ) as response:
+            async for audio_chunk in response.iter_bytes(chunk_size):
+                if stop_event.is_set():
+                    conditional_print("OpenAI TTS stop_event triggered mid-stream.", "default")
+                    return False
+                phrase_audio.write(audio_chunk)
+
+        # Add a small buffer of silence between chunks
+        phrase_audio.write(b'\x00' * chunk_size)
+        conditional_print("OpenAI TTS synthesis completed for phrase.", "default")
+        return True
     except Exception as e:
-        conditional_print(f"Azure TTS config error: {e}", "default")
-        await audio_queue.put(None)
+        conditional_print(f"OpenAI TTS error: {e}", "default")
+        return False
 
 async def openai_text_to_speech_processor(phrase_queue: asyncio.Queue,
-                                          audio_queue: asyncio.Queue,
+                                          audio_queue: PlaybackQueue,
                                           stop_event: asyncio.Event,
                                           openai_client: Optional[openai.AsyncOpenAI] = None):
     """
     Reads phrases from phrase_queue, calls OpenAI TTS streaming,
     and pushes audio chunks to audio_queue.
+
+    With PREFETCH_PHRASES > 0, requests for the next phrases are started
+    while earlier ones are still streaming; audio is still delivered in order.
     """
-    openai_client = openai_client or openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    openai_client = openai_client or get_openai_tts_client()
 
     try:
         model = CONFIG["TTS_MODELS"]["OPENAI_TTS"]["TTS_MODEL"]
@@ -504,56 +2203,53 @@ async def openai_text_to_speech_processor(phrase_queue: asyncio.Queue,
         speed = CONFIG["TTS_MODELS"]["OPENAI_TTS"]["TTS_SPEED"]
         response_format = CONFIG["TTS_MODELS"]["OPENAI_TTS"]["AUDIO_RESPONSE_FORMAT"]
         chunk_size = CONFIG["TTS_MODELS"]["OPENAI_TTS"]["TTS_CHUNK_SIZE"]
+        prefetch = CONFIG["TTS_MODELS"]["OPENAI_TTS"].get("PREFETCH_PHRASES", 0)
     except KeyError as e:
         conditional_print(f"Missing OpenAI TTS config: {e}", "default")
-        await audio_queue.put(None)
+        audio_queue.end()
+        return
+
+    synthesize = partial(
+        openai_stream_phrase, openai_client,
+        stop_event=stop_event, model=model, voice=voice, speed=speed,
+        response_format=response_format, chunk_size=chunk_size
+    )
+    synthesize = with_phrase_audio_cache(
+        with_tts_request_timing(synthesize, "OpenAI"), stop_event, "openai", voice, {"model": model, "speed": speed}, response_format
+    )
+
+    if prefetch > 0:
+        await synthesize_with_lookahead(phrase_queue, audio_queue, stop_event, prefetch, synthesize, "OpenAI")
         return
 
     try:
         while True:
             if stop_event.is_set():
                 conditional_print("OpenAI TTS stop_event is set. Exiting TTS loop.", "default")
-                await audio_queue.put(None)
+                audio_queue.end()
                 return
 
             phrase = await phrase_queue.get()
             if phrase is None:
                 conditional_print("OpenAI TTS received stop signal (None).", "default")
-                await audio_queue.put(None)
+                audio_queue.end()
                 return
 
             stripped_phrase = phrase.strip()
             if not stripped_phrase:
                 continue
 
-            try:
-                async with openai_client.audio.speech.with_streaming_response.create(
-                    model=model,
-                    voice=voice,
-                    input=stripped_phrase,
-                    speed=speed,
-                    response_format=response_format
-                ) as response:
-                    async for audio_chunk in response.iter_bytes(chunk_size):
-                        if stop_event.is_set():
-                            conditional_print("OpenAI TTS stop_event triggered mid-stream.", "default")
-                            break
-                        await audio_queue.put(audio_chunk)
-
-                # Add a small buffer of silence between chunks
-                await audio_queue.put(b'\x00' * chunk_size)
-                conditional_print("OpenAI TTS synthesis completed for phrase.", "default")
-
-            except Exception as e:
-                conditional_print(f"OpenAI TTS error: {e}", "default")
-                await audio_queue.put(None)
-                return
+            # One request at a time, streamed straight into audio_queue
+            await synthesize(stripped_phrase, audio_queue)
 
     except Exception as e:
         conditional_print(f"OpenAI TTS general error: {e}", "default")
-        await audio_queue.put(None)
+        audio_queue.end()
 
-async def process_streams(phrase_queue: asyncio.Queue, audio_queue: asyncio.Queue, stop_event: asyncio.Event):
+async def process_streams(phrase_queue: asyncio.Queue,
+                          audio_queue: PlaybackQueue,
+                          stop_event: asyncio.Event,
+                          audio_player: AudioPlayer):
     """
     Orchestrates TTS tasks + audio playback, with an external stop_event.
     """
@@ -576,26 +2272,32 @@ async def process_streams(phrase_queue: asyncio.Queue, audio_queue: asyncio.Queu
         else:
             raise ValueError(f"Unsupported TTS provider: {provider}")
 
-        loop = asyncio.get_running_loop()
-
         stt_instance.pause_listening()
         conditional_print("STT paused before starting TTS.", "segment")
 
         tts_task = asyncio.create_task(tts_processor(phrase_queue, audio_queue, stop_event))
-        audio_player_task = asyncio.create_task(start_audio_player_async(audio_queue, loop, stop_event))
+        audio_player_task = asyncio.create_task(
+            start_audio_player_async(audio_queue, stop_event, audio_player)
+        )
         conditional_print("Started TTS and audio playback tasks.", "default")
 
         await asyncio.gather(tts_task, audio_player_task)
 
-        stt_instance.start_listening()
-        conditional_print("STT resumed after completing TTS.", "segment")
-        # Broadcast the resumed state
-        await broadcast_stt_state()
-
     except Exception as e:
         conditional_print(f"Error in process_streams: {e}", "default")
-        stt_instance.start_listening()
-        await broadcast_stt_state()
+
+async def replay_cached_audio(audio_queue: PlaybackQueue,
+                              stop_event: asyncio.Event,
+                              audio_player: AudioPlayer,
+                              audio: Optional[bytes]):
+    """
+    Plays a cached answer's PCM straight from the audio queue, with no TTS round-trip.
+    """
+    if not audio:
+        return
+    audio_queue.write(audio)
+    audio_queue.end()
+    await start_audio_player_async(audio_queue, stop_event, audio_player)
 
 # =========== Streaming Chat Logic ===========
 def extract_content_from_openai_chunk(chunk: Any) -> Optional[str]:
@@ -612,184 +2314,802 @@ def compile_delimiter_pattern(delimiters: List[str]) -> Optional[re.Pattern]:
     pattern = "|".join(escaped)
     return re.compile(pattern)
 
+def split_at_word_boundary(text: str) -> Tuple[str, str]:
+    """
+    Splits `text` after its last whitespace so a partial word is never spoken.
+    Returns ("", text) when there is no complete word yet.
+    """
+    match = re.search(r"\s(?=\S*$)", text)
+    if not match:
+        return "", text
+    return text[:match.end()], text[match.end():]
+
+class StreamingSegmenter:
+    """
+    Splits streamed LLM text into phrases for TTS, scanning each character
+    once: every feed() only searches the newly appended text, plus the few
+    trailing characters held back last time because they could still turn
+    into a delimiter. Long phrases with no delimiter therefore stay linear.
+
+    A delimiter match is not a phrase boundary when it follows an abbreviation
+    or initials ("Dr. ", "e.g. ", "U.S. "), a list number at the start of a
+    phrase ("1. "), or, for delimiters without trailing whitespace, when the
+    next character isn't whitespace (decimals, URLs). Markdown code fences are
+    kept whole as their own phrase.
+
+    The first `character_max` characters are split at every boundary; after
+    that each phrase must be at least `growth_factor` times as long as the
+    last minimum (up to `max_phrase_chars`), so later audio comes in fewer,
+    longer requests instead of one unsegmented remainder. No phrase, code
+    blocks included, is longer than `max_phrase_chars`: longer text is cut at
+    its last word boundary (or hard, for a single overlong word).
+    """
+    FENCE = "```"
+    ABBREVIATIONS = frozenset({
+        "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "vs", "etc", "inc", "ltd", "co",
+        "no", "fig", "approx", "dept", "est", "ave", "blvd", "jan", "feb", "mar", "apr", "jun",
+        "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+    })
+    _INITIALS = re.compile(r"(?:[A-Za-z]\.)*[A-Za-z]")
+    _LAST_WORD = re.compile(r"(\S*)$")
+
+    def __init__(self, delimiters: Sequence[str], character_max: int,
+                 growth_factor: float = 2.0, max_phrase_chars: int = 400, enabled: bool = True):
+        tokens = set(delimiters) | {self.FENCE}
+        self.pattern = compile_delimiter_pattern(sorted(tokens)) if enabled and delimiters else None
+        # Text ending in one of these may still become a (longer) token
+        self._token_prefixes = {token[:i] for token in tokens for i in range(1, len(token))}
+        self._max_prefix = max(len(token) for token in tokens) - 1
+        # Matches that can't be decided at the very end of the text: a longer token
+        # may start the same way, or the delimiter needs the next character
+        self._needs_lookahead = {
+            token for token in tokens
+            if not token[-1].isspace() or any(other != token and other.startswith(token) for other in tokens)
+        }
+        self.character_max = character_max
+        self.growth_factor = growth_factor
+        self.max_phrase_chars = max_phrase_chars
+        self.min_phrase_chars = 0
+        self.emitted_chars = 0
+        self.in_fence = False
+        self._parts: List[str] = []
+        self._length = 0
+        self._held = ""
+        # Last few characters of _parts, for the word in front of a delimiter
+        self._tail = ""
+
+    @property
+    def pending_length(self) -> int:
+        return self._length + len(self._held)
+
+    def _append(self, text: str):
+        if text:
+            self._parts.append(text)
+            self._length += len(text)
+            self._tail = (self._tail + text)[-16:]
+
+    def _take(self, text: str) -> str:
+        phrase = "".join(self._parts) + text
+        self._parts = []
+        self._length = 0
+        self._tail = ""
+        return phrase
+
+    def _emitted(self, phrase: str):
+        self.emitted_chars += len(phrase)
+        if self.emitted_chars >= self.character_max:
+            self.min_phrase_chars = min(
+                self.max_phrase_chars,
+                max(self.character_max, int(self.min_phrase_chars * self.growth_factor)),
+            )
+
+    def _emit(self, phrases: List[str], phrase: str):
+        while len(phrase) > self.max_phrase_chars:
+            head, rest = split_at_word_boundary(phrase[:self.max_phrase_chars])
+            if not head.strip():
+                head, rest = phrase[:self.max_phrase_chars], ""
+            phrases.append(head.strip())
+            self._emitted(head.strip())
+            phrase = (rest + phrase[self.max_phrase_chars:]).strip()
+        if phrase:
+            phrases.append(phrase)
+            self._emitted(phrase)
+
+    def _is_boundary(self, text: str, match: re.Match, start: int) -> bool:
+        token = match.group()
+        if self.in_fence:
+            return False
+        if not token[-1].isspace():
+            # "." or ":" style delimiters must be followed by whitespace (3.14, example.com)
+            if match.end() < len(text) and not text[match.end()].isspace():
+                return False
+        if "." in token:
+            lo = max(start, match.start() - 32)
+            before = text[lo:match.start()]
+            if lo == start:
+                before = self._tail + before
+            word = self._LAST_WORD.search(before).group(1)
+            if word.lower() in self.ABBREVIATIONS or self._INITIALS.fullmatch(word):
+                return False
+            # "1. " opening a list item
+            if word.isdigit() and self._length <= len(self._tail) and before.strip() == word:
+                return False
+        return self._length + match.end() - start >= self.min_phrase_chars
+
+    def feed(self, content: str) -> List[str]:
+        """
+        Adds streamed text; returns the phrases it completed (stripped, non-empty).
+        """
+        text = self._held + content
+        self._held = ""
+        if self.pattern is None:
+            self._append(text)
+            return []
+
+        phrases: List[str] = []
+        start = 0
+        scanned_to = 0
+        undecided_from: Optional[int] = None
+        for match in self.pattern.finditer(text):
+            if match.end() == len(text) and match.group() in self._needs_lookahead:
+                undecided_from = match.start()
+                break
+            scanned_to = match.end()
+            if match.group() == self.FENCE:
+                if not self.in_fence:
+                    # Speak the prose before a code block on its own
+                    self._emit(phrases, self._take(text[start:match.start()]).strip())
+                    start = match.start()
+                    self.in_fence = True
+                else:
+                    self.in_fence = False
+                    self._emit(phrases, self._take(text[start:match.end()]).strip())
+                    start = match.end()
+                continue
+            if self._is_boundary(text, match, start):
+                self._emit(phrases, self._take(text[start:match.end()]).strip())
+                start = match.end()
+
+        if undecided_from is None:
+            # Hold back a trailing partial token ("``", "?") until the next chunk
+            undecided_from = len(text)
+            for k in range(min(self._max_prefix, len(text) - max(start, scanned_to)), 0, -1):
+                if text[-k:] in self._token_prefixes:
+                    undecided_from = len(text) - k
+                    break
+        undecided_from = max(start, undecided_from)
+        self._append(text[start:undecided_from])
+        self._held = text[undecided_from:]
+        while self._length > self.max_phrase_chars:
+            # No boundary in sight (long sentence, code block): cut at a word boundary
+            buffered = self._take("")
+            head, rest = split_at_word_boundary(buffered[:self.max_phrase_chars])
+            if not head.strip():
+                head, rest = buffered[:self.max_phrase_chars], ""
+            self._emit(phrases, head.strip())
+            self._append(rest + buffered[self.max_phrase_chars:])
+        return phrases
+
+    def take_prefix(self) -> str:
+        """
+        Removes and returns the buffered text up to its last whitespace (for the
+        first-phrase deadline); the partial last word stays buffered.
+        """
+        prefix, rest = split_at_word_boundary(self._take(self._held))
+        self._held = ""
+        self._append(rest)
+        if not prefix.strip():
+            return ""
+        self._emitted(prefix.strip())
+        return prefix.strip()
+
+    def flush(self) -> str:
+        """Returns whatever is left at the end of the stream."""
+        remainder = self._take(self._held).strip()
+        self._held = ""
+        return remainder
+
 async def process_chunks(chunk_queue: asyncio.Queue,
                          phrase_queue: asyncio.Queue,
-                         delimiter_pattern: Optional[re.Pattern],
-                         use_segmentation: bool,
-                         character_max: int):
-    working_string = ""
-    chars_processed = 0
-    segmentation_active = use_segmentation
-
-    while True:
-        chunk = await chunk_queue.get()
-        if chunk is None:
-            if working_string.strip():
-                phrase = working_string.strip()
-                await phrase_queue.put(phrase)
-                conditional_print(f"Final Segment: {phrase}", "segment")
-            await phrase_queue.put(None)
-            break
-
-        content = extract_content_from_openai_chunk(chunk)
-        if content:
-            working_string += content
-            if segmentation_active and delimiter_pattern:
-                while True:
-                    match = delimiter_pattern.search(working_string)
-                    if match:
-                        end_idx = match.end()
-                        phrase = working_string[:end_idx].strip()
-                        if phrase:
-                            await phrase_queue.put(phrase)
-                            chars_processed += len(phrase)
-                            conditional_print(f"Segment: {phrase}", "segment")
-                        working_string = working_string[end_idx:]
-                        if chars_processed >= character_max:
-                            segmentation_active = False
-                            break
-                    else:
-                        break
+                         segmenter: StreamingSegmenter,
+                         first_phrase_deadline_ms: Optional[float] = None,
+                         first_phrase_deadline_chars: Optional[int] = None,
+                         started_at: Optional[float] = None) -> Optional[float]:
+    """
+    Splits streamed content into phrases for TTS with `segmenter`.
+
+    When a first-phrase deadline is given, the first phrase is emitted early
+    (cut at a word boundary) if no delimiter has appeared within
+    `first_phrase_deadline_ms` of the first content or once
+    `first_phrase_deadline_chars` characters are buffered.
+
+    Returns the seconds from `started_at` to the first phrase, or None if
+    nothing was emitted.
+    """
+    loop = asyncio.get_running_loop()
+    started_at = loop.time() if started_at is None else started_at
+    deadline_enabled = segmenter.pattern is not None and (
+        first_phrase_deadline_ms is not None or first_phrase_deadline_chars is not None
+    )
+    deadline_at: Optional[float] = None
+    first_phrase_latency: Optional[float] = None
+    get_task: Optional[asyncio.Future] = None
+
+    last_emit_at = started_at
+
+    async def emit(phrase: str, label: str):
+        nonlocal first_phrase_latency, last_emit_at
+        await phrase_queue.put(phrase)
+        now = loop.time()
+        if first_phrase_latency is None:
+            first_phrase_latency = now - started_at
+        observe_stage("segment_interval", now - last_emit_at)
+        last_emit_at = now
+        SEGMENTS_EMITTED.inc()
+        conditional_print(f"{label}: {phrase}", "segment")
+
+    async def emit_speculative_prefix():
+        prefix = segmenter.take_prefix()
+        if prefix:
+            await emit(prefix, "Deadline Segment")
+
+    try:
+        while True:
+            timeout = None
+            if deadline_at is not None and first_phrase_latency is None:
+                timeout = max(0.0, deadline_at - loop.time())
+
+            if get_task is None:
+                get_task = asyncio.ensure_future(chunk_queue.get())
+            done, _ = await asyncio.wait({get_task}, timeout=timeout)
+            if not done:
+                # Deadline passed without a delimiter: speak what we have so far.
+                deadline_at = None
+                await emit_speculative_prefix()
+                continue
+            chunk = get_task.result()
+            get_task = None
+
+            if chunk is None:
+                remainder = segmenter.flush()
+                if remainder:
+                    await emit(remainder, "Final Segment")
+                await phrase_queue.put(None)
+                break
+
+            content = extract_content_from_openai_chunk(chunk)
+            if content:
+                if deadline_enabled and first_phrase_latency is None and deadline_at is None \
+                        and first_phrase_deadline_ms is not None:
+                    deadline_at = loop.time() + first_phrase_deadline_ms / 1000
+                for phrase in segmenter.feed(content):
+                    await emit(phrase, "Segment")
+                if deadline_enabled and first_phrase_latency is None \
+                        and first_phrase_deadline_chars is not None \
+                        and segmenter.pending_length >= first_phrase_deadline_chars:
+                    await emit_speculative_prefix()
+    finally:
+        if get_task is not None and not get_task.done():
+            get_task.cancel()
+
+    return first_phrase_latency
+
+SYSTEM_PROMPT = {"role": "system", "content": "You are a helpful assistant. Users live in Orlando, Fl"}
+
+def prepare_message(msg: Any, idx: int = 0) -> Dict[str, str]:
+    """
+    Validates one client message ({"sender", "text"}) and converts it to an
+    OpenAI chat message.
+    """
+    if not isinstance(msg, dict):
+        raise HTTPException(status_code=400, detail=f"Message at index {idx} must be a dictionary.")
+    sender = msg.get("sender")
+    text = msg.get("text")
+    if not sender or not isinstance(sender, str):
+        raise HTTPException(status_code=400, detail=f"Message at index {idx} missing valid 'sender'.")
+    if not text or not isinstance(text, str):
+        raise HTTPException(status_code=400, detail=f"Message at index {idx} missing valid 'text'.")
+
+    if sender.lower() == 'user':
+        role = 'user'
+    elif sender.lower() == 'assistant':
+        role = 'assistant'
+    else:
+        raise HTTPException(status_code=400, detail=f"Invalid sender at index {idx}.")
+
+    return {"role": role, "content": text}
 
 async def validate_messages_for_ws(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     if not isinstance(messages, list):
         raise HTTPException(status_code=400, detail="'messages' must be a list.")
-    prepared = []
-    for idx, msg in enumerate(messages):
-        if not isinstance(msg, dict):
-            raise HTTPException(status_code=400, detail=f"Message at index {idx} must be a dictionary.")
-        sender = msg.get("sender")
-        text = msg.get("text")
-        if not sender or not isinstance(sender, str):
-            raise HTTPException(status_code=400, detail=f"Message at index {idx} missing valid 'sender'.")
-        if not text or not isinstance(text, str):
-            raise HTTPException(status_code=400, detail=f"Message at index {idx} missing valid 'text'.")
-
-        if sender.lower() == 'user':
-            role = 'user'
-        elif sender.lower() == 'assistant':
-            role = 'assistant'
-        else:
-            raise HTTPException(status_code=400, detail=f"Invalid sender at index {idx}.")
+    prepared = [prepare_message(msg, idx) for idx, msg in enumerate(messages)]
+    prepared.insert(0, SYSTEM_PROMPT)
+    return prepared
+
+# =========== Conversation Store ===========
+@lru_cache(maxsize=None)
+def get_token_encoding():
+    """
+    tiktoken encoding for the chat model, or None when tiktoken isn't
+    installed (token counts then fall back to a characters/4 estimate).
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(DEPLOYMENT_NAME)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        conditional_print(f"tiktoken unavailable ({e}); estimating token counts.", "default")
+        return None
 
-        prepared.append({"role": role, "content": text})
+def count_message_tokens(message: Dict[str, Any]) -> int:
+    content = message.get("content") or ""
+    encoding = get_token_encoding()
+    content_tokens = len(encoding.encode(content)) if encoding is not None else len(content) // 4 + 1
+    return content_tokens + CONFIG["CONTEXT_WINDOW"]["TOKENS_PER_MESSAGE"]
 
-    system_prompt = {"role": "system", "content": "You are a helpful assistant. Users live in Orlando, Fl"}
-    prepared.insert(0, system_prompt)
-    return prepared
+async def summarize_messages(previous_summary: Optional[str], messages: Sequence[Dict[str, Any]]) -> str:
+    """
+    Folds `messages` (and the summary of everything before them) into a short
+    summary with one non-streaming completion.
+    """
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    if previous_summary:
+        transcript = f"Earlier summary: {previous_summary}\n{transcript}"
+    response = await client.chat.completions.create(
+        model=DEPLOYMENT_NAME,
+        messages=[
+            {"role": "system", "content": "Summarize this conversation in a few sentences. "
+                                          "Keep names, facts, preferences and open questions."},
+            {"role": "user", "content": transcript},
+        ],
+        max_tokens=CONFIG["CONTEXT_WINDOW"]["SUMMARY_MAX_TOKENS"],
+        temperature=0.2,
+    )
+    return response.choices[0].message.content.strip()
+
+class Conversation:
+    """
+    Server-side history of one conversation, kept as already-prepared OpenAI
+    messages (system prompt first). Each turn only validates and appends the
+    new message instead of rebuilding the whole history.
+
+    Token counts are computed once per message and kept as running totals, so
+    the prompt is fitted to CONTEXT_WINDOW.MAX_PROMPT_TOKENS without recounting
+    history: oldest messages leave the window, and between turns they are
+    folded into a summary in the background.
+    """
+    def __init__(self, conversation_id: str, messages: Optional[List[Dict[str, Any]]] = None):
+        self.conversation_id = conversation_id
+        self.messages: List[Dict[str, Any]] = [SYSTEM_PROMPT]
+        # _cumulative_tokens[i] = tokens of messages[1..i]
+        self._cumulative_tokens: List[int] = [0]
+        self.system_tokens = count_message_tokens(SYSTEM_PROMPT)
+        self.window_start = 1
+        self.summary: Optional[Dict[str, str]] = None
+        self.summary_tokens = 0
+        self.summary_upto = 1
+        self.summary_task: Optional[asyncio.Task] = None
+        self.last_used = time.monotonic()
+        for message in (messages or [])[1:]:
+            self._append(message)
+
+    def _append(self, message: Dict[str, Any]) -> None:
+        self.messages.append(message)
+        self._cumulative_tokens.append(self._cumulative_tokens[-1] + count_message_tokens(message))
+
+    def add_user_message(self, msg: Any) -> None:
+        self._append(prepare_message(msg, len(self.messages) - 1))
+
+    def add_assistant_text(self, text: str) -> None:
+        if text:
+            self._append({"role": "assistant", "content": text})
+
+    def window_tokens(self) -> int:
+        history = self._cumulative_tokens[-1] - self._cumulative_tokens[self.window_start - 1]
+        return self.system_tokens + self.summary_tokens + history
+
+    def prompt(self) -> List[Dict[str, Any]]:
+        """
+        The message list for one turn: system prompt, summary of older turns
+        (if any) and the newest messages that fit the token budget. Over budget,
+        the window is trimmed to TRIM_TO_RATIO of it in one step, so the prompt
+        prefix stays the same for the next few turns.
+
+        A new list, so the tool-call messages a turn adds stay out of the
+        stored history and an interrupted tool round can't leave it half-written.
+        """
+        settings = CONFIG["CONTEXT_WINDOW"]
+        budget = settings["MAX_PROMPT_TOKENS"]
+        if self.window_tokens() > budget:
+            target = budget * settings["TRIM_TO_RATIO"]
+            dropped_from = self.window_start
+            while self.window_start < len(self.messages) - 1 and self.window_tokens() > target:
+                self.window_start += 1
+            conditional_print(
+                f"[Context]: dropped {self.window_start - dropped_from} message(s), "
+                f"window now {self.window_tokens()}/{budget} tokens", "default")
+
+        prompt = [self.messages[0]]
+        if self.summary is not None:
+            prompt.append(self.summary)
+        prompt.extend(self.messages[self.window_start:])
+        return prompt
+
+    def schedule_summary(self) -> None:
+        """
+        Called between turns. Once the window passes SUMMARIZE_AT_RATIO of the
+        budget, everything but the newest KEEP_RECENT_MESSAGES is summarized in
+        a background task; the next turn picks the summary up if it's ready.
+        """
+        settings = CONFIG["CONTEXT_WINDOW"]
+        if not settings["SUMMARIZE"] or (self.summary_task is not None and not self.summary_task.done()):
+            return
+        if self.window_tokens() < settings["MAX_PROMPT_TOKENS"] * settings["SUMMARIZE_AT_RATIO"]:
+            return
+        cut = len(self.messages) - settings["KEEP_RECENT_MESSAGES"]
+        if cut <= self.summary_upto:
+            return
+        self.summary_task = asyncio.create_task(self._summarize(cut))
+
+    async def _summarize(self, cut: int) -> None:
+        started = time.perf_counter()
+        previous = self.summary["content"] if self.summary is not None else None
+        try:
+            text = await summarize_messages(previous, self.messages[self.summary_upto:cut])
+        except Exception as e:
+            conditional_print(f"[Context]: summary failed: {e}", "default")
+            return
+        # Messages are append-only, so indices below `cut` still mean the same turns
+        self.summary = {"role": "system", "content": f"Summary of the earlier conversation: {text}"}
+        self.summary_tokens = count_message_tokens(self.summary)
+        self.summary_upto = cut
+        self.window_start = max(self.window_start, cut)
+        conditional_print(
+            f"[Context]: summarized up to message {cut} in {(time.perf_counter() - started) * 1000:.0f} ms, "
+            f"window now {self.window_tokens()} tokens", "default")
+
+class ConversationStore:
+    """
+    Conversations keyed by id, shared by every websocket, so a reconnecting
+    client keeps its context. Least recently used conversations are evicted
+    past `max_conversations`, and idle ones expire after `idle_ttl_seconds`.
+    """
+    def __init__(self, max_conversations: int, idle_ttl_seconds: float):
+        self.max_conversations = max_conversations
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+
+    def get(self, conversation_id: Optional[str]) -> Optional[Conversation]:
+        self._expire()
+        conversation = self._conversations.get(conversation_id) if conversation_id else None
+        if conversation is not None:
+            conversation.last_used = time.monotonic()
+            self._conversations.move_to_end(conversation_id)
+        return conversation
+
+    def create(self, messages: Optional[List[Dict[str, Any]]] = None,
+               conversation_id: Optional[str] = None) -> Conversation:
+        conversation = Conversation(conversation_id or uuid.uuid4().hex, messages)
+        self._conversations[conversation.conversation_id] = conversation
+        self._conversations.move_to_end(conversation.conversation_id)
+        while len(self._conversations) > self.max_conversations:
+            self._conversations.popitem(last=False)
+        return conversation
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.idle_ttl_seconds
+        while self._conversations:
+            oldest = next(iter(self._conversations.values()))
+            if oldest.last_used >= cutoff:
+                break
+            self._conversations.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+conversation_store = ConversationStore(
+    CONFIG["CONVERSATIONS"]["MAX_CONVERSATIONS"],
+    CONFIG["CONVERSATIONS"]["IDLE_TTL_SECONDS"],
+)
+
+async def resolve_conversation(data: Dict[str, Any]) -> Tuple[Optional[Conversation], bool]:
+    """
+    Applies one "chat" action to the conversation store and returns
+    (conversation, created). Delta uploads ({"conversation_id", "message"})
+    append the single new message. A full "messages" array (older clients,
+    or a resync after the server lost the conversation) replaces the history.
+    Returns (None, False) when the id is unknown and the client must resync.
+    """
+    conversation_id = data.get("conversation_id")
+    if "messages" in data:
+        validated = await validate_messages_for_ws(data["messages"])
+        return conversation_store.create(validated, conversation_id), True
+
+    conversation = conversation_store.get(conversation_id)
+    if conversation is None:
+        if conversation_id:
+            return None, False
+        conversation = conversation_store.create()
+        created = True
+    else:
+        created = False
+    conversation.add_user_message(data.get("message"))
+    return conversation, created
+
+# =========== Response Cache ===========
+class CachedResponse:
+    __slots__ = ("expires_at", "text_chunks", "audio")
+
+    def __init__(self, expires_at: float, text_chunks: Tuple[str, ...], audio: Optional[bytes]):
+        self.expires_at = expires_at
+        self.text_chunks = text_chunks
+        self.audio = audio
+
+class ResponseCache:
+    """
+    Optional cache of whole answers (streamed text plus the PCM that was
+    played) for repeated short questions. Keyed by the normalized user text and
+    a hash of everything else the answer depends on: model, tools, system
+    prompt and summary, the last few messages, and the TTS voice settings.
+
+    Freshness: an answer lives TTL_SECONDS, or the shortest TOOL_TTL_SECONDS of
+    the tools it used; tools without an entry (and any with TTL 0, like
+    get_time) make the answer uncacheable.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "uncacheable": 0, "evictions": 0}
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        text = re.sub(r"['\u2019]", "", text.lower())
+        return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+    def key_for(self, prompt: Sequence[Dict[str, Any]]) -> Optional[str]:
+        """Cache key for a turn whose prompt ends with the new user message."""
+        if not prompt or prompt[-1].get("role") != "user":
+            return None
+        settings = CONFIG["RESPONSE_CACHE"]
+        history = prompt[:-1]
+        context = [m for m in history if m["role"] == "system"]
+        recent = [m for m in history if m["role"] != "system"]
+        if settings["CONTEXT_MESSAGES"]:
+            context += recent[-settings["CONTEXT_MESSAGES"]:]
+        provider = CONFIG["GENERAL_TTS"]["TTS_PROVIDER"].lower()
+        tts_settings = CONFIG["TTS_MODELS"]["AZURE_TTS" if provider == "azure" else "OPENAI_TTS"]
+        fingerprint = json.dumps(
+            [DEPLOYMENT_NAME, tool_registry.tools_json(), context,
+             CONFIG["GENERAL_TTS"]["TTS_ENABLED"], provider, tts_settings],
+            sort_keys=True, default=str,
+        )
+        context_hash = hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+        return f"{self.normalize(prompt[-1]['content'])}|{context_hash}"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry
+
+    def ttl_for(self, tools_used: Set[str]) -> float:
+        settings = CONFIG["RESPONSE_CACHE"]
+        ttl = settings["TTL_SECONDS"]
+        for name in tools_used:
+            ttl = min(ttl, settings["TOOL_TTL_SECONDS"].get(name, 0))
+        return ttl
+
+    def store(self, key: str, text_chunks: Sequence[str], audio: Optional[bytes], tools_used: Set[str]):
+        ttl = self.ttl_for(tools_used)
+        if ttl <= 0:
+            self.stats["uncacheable"] += 1
+            return
+        self._entries[key] = CachedResponse(time.monotonic() + ttl, tuple(text_chunks), audio)
+        self._entries.move_to_end(key)
+        self.stats["stores"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "audio_bytes": sum(len(e.audio or b"") for e in self._entries.values()),
+        }
+
+response_cache = ResponseCache(CONFIG["RESPONSE_CACHE"]["MAX_ENTRIES"])
+
+# chunk_queues of in-flight completions, sampled for the queue depth gauge
+live_chunk_queues: Set[asyncio.Queue] = set()
+
+def completion_request(messages: Sequence[Dict[str, Any]], allow_tools: bool) -> Dict[str, Any]:
+    """
+    Keyword arguments for one streamed completion round. OpenAI prompt caching
+    matches on an exact prefix (tools, then system prompt, then history), so
+    every round sends the same precomputed tools payload and the same stored
+    message dicts; a round that may not call tools says so with
+    tool_choice="none" instead of dropping the tools.
+    """
+    return {
+        "model": DEPLOYMENT_NAME,
+        "messages": messages,
+        "tools": get_tools(),
+        "tool_choice": "auto" if allow_tools else "none",
+        "stream": True,
+        "stream_options": {"include_usage": True},
+        "temperature": 0.7,
+        "top_p": 1.0,
+    }
+
+def cached_prompt_tokens(usage: Any) -> int:
+    """Prompt tokens served from the provider's prompt cache (0 if not reported)."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+
+def log_round_timing(round_number: int,
+                     round_started: float,
+                     first_token_at: Optional[float],
+                     stream_done_at: float,
+                     tools_done_at: Optional[float],
+                     usage: Any) -> None:
+    """
+    Logs where one agent-loop round spent its time: time to the first token,
+    the rest of the stream, and the tool calls it triggered (if any).
+    """
+    ttft = f"{(first_token_at - round_started) * 1000:.0f} ms" if first_token_at is not None else "n/a"
+    parts = [f"first token {ttft}", f"stream {(stream_done_at - round_started) * 1000:.0f} ms"]
+    if tools_done_at is not None:
+        parts.append(f"tools {(tools_done_at - stream_done_at) * 1000:.0f} ms")
+    if usage is not None:
+        parts.append(f"tokens {usage.prompt_tokens}+{usage.completion_tokens} ({cached_prompt_tokens(usage)} cached)")
+    conditional_print(f"[Round {round_number}]: " + ", ".join(parts), "tool_call")
 
 async def stream_openai_completion(messages: Sequence[Dict[str, Union[str, Any]]],
-                                   phrase_queue: asyncio.Queue) -> AsyncIterator[str]:
-    delimiter_pattern = compile_delimiter_pattern(CONFIG["PROCESSING_PIPELINE"]["DELIMITERS"])
-    use_segmentation = CONFIG["PROCESSING_PIPELINE"]["USE_SEGMENTATION"]
-    character_max = CONFIG["PROCESSING_PIPELINE"]["CHARACTER_MAXIMUM"]
+                                   phrase_queue: asyncio.Queue,
+                                   gen_stop_event: asyncio.Event) -> AsyncIterator[str]:
+    pipeline_settings = CONFIG["PROCESSING_PIPELINE"]
+    segmenter = StreamingSegmenter(
+        pipeline_settings["DELIMITERS"],
+        pipeline_settings["CHARACTER_MAXIMUM"],
+        growth_factor=pipeline_settings["SEGMENT_GROWTH_FACTOR"],
+        max_phrase_chars=pipeline_settings["MAX_SEGMENT_CHARS"],
+        enabled=pipeline_settings["USE_SEGMENTATION"],
+    )
+    deadline_ms = deadline_chars = None
+    if CONFIG["PROCESSING_PIPELINE"]["FIRST_PHRASE_DEADLINE_ENABLED"]:
+        deadline_ms = CONFIG["PROCESSING_PIPELINE"]["FIRST_PHRASE_DEADLINE_MS"]
+        deadline_chars = CONFIG["PROCESSING_PIPELINE"]["FIRST_PHRASE_DEADLINE_CHARS"]
 
     chunk_queue = asyncio.Queue()
+    live_chunk_queues.add(chunk_queue)
     chunk_processor_task = asyncio.create_task(
-        process_chunks(chunk_queue, phrase_queue, delimiter_pattern, use_segmentation, character_max)
+        process_chunks(chunk_queue, phrase_queue, segmenter,
+                       first_phrase_deadline_ms=deadline_ms,
+                       first_phrase_deadline_chars=deadline_chars,
+                       started_at=asyncio.get_running_loop().time())
     )
 
-    try:
-        # 1) Get the streaming response
-        response = await client.chat.completions.create(
-            model=DEPLOYMENT_NAME,
-            messages=messages,
-            tools=get_tools(),
-            tool_choice="auto",
-            stream=True,
-            temperature=0.7,
-            top_p=1.0,
-        )
-
-        tool_calls = []
+    max_tool_rounds = CONFIG["TOOLS"]["MAX_TOOL_ROUNDS"]
+    token_budget = CONFIG["TOOLS"]["TURN_TOKEN_BUDGET"]
+    tokens_used = 0
+    cached_tokens = 0
+    round_number = 0
+    loop = asyncio.get_running_loop()
 
-        # 2) Consume the streamed chunks in a loop
-        async for chunk in response:
-            # If user triggers the stop event in the middle of streaming
-            if GEN_STOP_EVENT.is_set():
-                try:
-                    await response.close()
-                except Exception as e:
-                    conditional_print(f"Error closing streaming response: {e}", "default")
-
-                conditional_print("GEN_STOP_EVENT triggered. Stopping text generation mid-stream.", "default")
+    streamed_tools = None
+    try:
+        # Agent loop: every round streams a completion; if the model asks for
+        # tools, run them and stream another round. Once the depth or token
+        # budget is spent, the last round disallows tool calls so the model
+        # has to answer; any it returns anyway are dropped and the loop ends.
+        while True:
+            round_number += 1
+            allow_tools = round_number <= max_tool_rounds and tokens_used < token_budget
+            round_started = loop.time()
+            first_token_at = None
+            round_usage = None
+            ignored_tool_calls = False
+
+            # 1) Get the streaming response
+            response = await client.chat.completions.create(**completion_request(messages, allow_tools))
+
+            streamed_tools = StreamingToolCalls(get_available_functions())
+
+            # 2) Consume the streamed chunks in a loop
+            async for chunk in response:
+                # If user triggers the stop event in the middle of streaming
+                if gen_stop_event.is_set():
+                    try:
+                        await response.close()
+                    except Exception as e:
+                        conditional_print(f"Error closing streaming response: {e}", "default")
+
+                    conditional_print("Generation stop event triggered. Stopping text generation mid-stream.", "default")
+                    break
+
+                # The usage-only chunk at the end of the stream has no choices
+                if getattr(chunk, "usage", None):
+                    round_usage = chunk.usage
+
+                # Otherwise, parse this chunk
+                delta = chunk.choices[0].delta if chunk.choices and chunk.choices[0].delta else None
+                if delta and (delta.content or delta.tool_calls) and first_token_at is None:
+                    first_token_at = loop.time()
+                    observe_stage("llm_first_delta", first_token_at - round_started)
+                if delta and delta.content:
+                    yield delta.content
+                    await chunk_queue.put(chunk)
+                elif delta and delta.tool_calls:
+                    if not allow_tools:
+                        # tool_choice="none" isn't honoured by every provider; the round
+                        # limit is, so calls on the final round are never run
+                        ignored_tool_calls = True
+                        continue
+                    # Each call starts running as soon as its arguments object closes
+                    for tc_chunk in delta.tool_calls:
+                        streamed_tools.add(tc_chunk)
+
+            stream_done_at = loop.time()
+            LLM_ROUNDS.inc()
+            observe_stage("llm_stream", stream_done_at - round_started)
+            if round_usage is not None:
+                tokens_used += round_usage.total_tokens
+                cached_tokens += cached_prompt_tokens(round_usage)
+
+            # 3) Once streaming is finished (or broken out of), collect tool results
+            tool_calls = streamed_tools.tool_calls
+            if gen_stop_event.is_set():
+                streamed_tools.cancel()
+                break
+            if not tool_calls:
+                if ignored_tool_calls:
+                    conditional_print(f"[Agent Loop]: ignored tool calls on final round {round_number}", "tool_call")
+                log_round_timing(round_number, round_started, first_token_at, stream_done_at, None, round_usage)
                 break
 
-            # Otherwise, parse this chunk
-            delta = chunk.choices[0].delta if chunk.choices and chunk.choices[0].delta else None
-            if delta and delta.content:
-                yield delta.content
-                await chunk_queue.put(chunk)
-            elif delta and delta.tool_calls:
-                tc_list = delta.tool_calls
-                for tc_chunk in tc_list:
-                    while len(tool_calls) <= tc_chunk.index:
-                        tool_calls.append({"id": "", "type": "function", "function": {"name": "", "arguments": ""}})
-
-                    tc = tool_calls[tc_chunk.index]
-                    if tc_chunk.id:
-                        tc["id"] += tc_chunk.id
-                    if tc_chunk.function.name:
-                        tc["function"]["name"] += tc_chunk.function.name
-                    if tc_chunk.function.arguments:
-                        tc["function"]["arguments"] += tc_chunk.function.arguments
-
-        # 3) Once streaming is finished (or broken out of), handle tool calls
-        if not GEN_STOP_EVENT.is_set() and tool_calls:
             conditional_print("[Tool Calls Detected]:", "tool_call")
             for tc in tool_calls:
                 conditional_print(json.dumps(tc, indent=2), "tool_call")
+            if streamed_tools.started_early:
+                conditional_print(f"[Tool Calls]: {streamed_tools.started_early}/{len(tool_calls)} started before the stream ended", "tool_call")
 
             messages.append({"role": "assistant", "tool_calls": tool_calls})
-            funcs = get_available_functions()
-            for tool_call in tool_calls:
-                try:
-                    fn, fn_args = get_function_and_args(tool_call, funcs)
-                    conditional_print(f"[Calling Function]: {fn.__name__}", "function_call")
-                    conditional_print(f"[With Arguments]: {json.dumps(fn_args, indent=2)}", "function_call")
-
-                    resp = fn(**fn_args)
-                    conditional_print(f"[Function Output]: {resp}", "function_call")
-                    messages.append({
-                        "tool_call_id": tool_call["id"],
-                        "role": "tool",
-                        "name": fn.__name__,
-                        "content": json.dumps(resp)
-                    })
-                except ValueError as e:
-                    messages.append({"role": "assistant", "content": f"[Error]: {str(e)}"})
-
-            # Follow-up only if generation wasn't stopped
-            if not GEN_STOP_EVENT.is_set():
-                follow_up = await client.chat.completions.create(
-                    model=DEPLOYMENT_NAME,
-                    messages=messages,
-                    stream=True,
-                    temperature=0.7,
-                    top_p=1.0,
-                )
-                async for fu_chunk in follow_up:
-                    if GEN_STOP_EVENT.is_set():
-                        try:
-                            await follow_up.close()
-                        except Exception as e:
-                            conditional_print(f"Error closing follow-up response: {e}", "default")
+            messages.extend(await streamed_tools.results())
+            observe_stage("tool_round", loop.time() - stream_done_at)
+            log_round_timing(round_number, round_started, first_token_at, stream_done_at, loop.time(), round_usage)
 
-                        conditional_print("GEN_STOP_EVENT triggered mid-tool-call response.", "default")
-                        break
-
-                    content = extract_content_from_openai_chunk(fu_chunk)
-                    if content:
-                        yield content
-                    await chunk_queue.put(fu_chunk)
+            if gen_stop_event.is_set():
+                break
+            if tokens_used >= token_budget:
+                conditional_print(f"[Agent Loop]: token budget spent ({tokens_used}/{token_budget}), answering without tool calls", "tool_call")
 
         # 4) Signal the chunk_processor we have no more data
         await chunk_queue.put(None)
-        await chunk_processor_task
+        conditional_print(f"[Agent Loop]: {round_number} round(s), {tokens_used} tokens, {cached_tokens} prompt tokens from cache", "default")
+        first_phrase_latency = await chunk_processor_task
+        if first_phrase_latency is not None:
+            observe_stage("first_segment", first_phrase_latency)
+        if first_phrase_latency is not None:
+            conditional_print(f"Time to first phrase: {first_phrase_latency * 1000:.0f} ms", "default")
 
     except Exception as e:
         await chunk_queue.put(None)
         raise HTTPException(status_code=500, detail=f"OpenAI API error: {e}")
+    finally:
+        # Tools started mid-stream must not outlive an aborted turn
+        if streamed_tools is not None:
+            streamed_tools.cancel()
+        live_chunk_queues.discard(chunk_queue)
 
 # =========== FastAPI Setup ===========
 app = FastAPI()
@@ -832,14 +3152,20 @@ async def pause_stt_endpoint():
 
 # ---- Audio Playback Toggle Endpoint ----
 @app.post("/api/toggle-audio")
-async def toggle_audio_playback():
+async def toggle_audio_playback(session_id: Optional[str] = None):
+    """
+    Toggles audio output for one session, or for every session when
+    no session_id is given.
+    """
+    sessions = resolve_sessions(session_id)
     try:
-        if audio_player.is_playing:
-            audio_player.stop_stream()
-            return {"audio_playing": False}
-        else:
-            audio_player.start_stream()
-            return {"audio_playing": True}
+        audio_playing = not any(session.audio_player.is_playing for session in sessions)
+        for session in sessions:
+            if audio_playing:
+                session.audio_player.start_stream()
+            else:
+                session.audio_player.stop_stream()
+        return {"audio_playing": audio_playing}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to toggle audio playback: {str(e)}")
 
@@ -854,39 +3180,231 @@ async def toggle_tts():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to toggle TTS: {str(e)}")
 
+# ---- Azure TTS Pool Stats Endpoint ----
+@app.get("/api/tts-pool-stats")
+async def tts_pool_stats():
+    """
+    How many phrases were served by a pre-connected synthesizer and how much
+    handshake time that saved.
+    """
+    return {
+        "pool_size": azure_synthesizer_pool.size,
+        "idle": len(azure_synthesizer_pool._idle),
+        **azure_synthesizer_pool.stats,
+    }
+
+# ---- Tool Stats Endpoint ----
+@app.get("/api/tool-stats")
+async def tool_stats():
+    """
+    Per-tool call counts, failures and latency (ms), plus weather cache counters.
+    """
+    return {"tools": tool_latency_stats, "weather_cache": weather_cache.stats}
+
+# ---- Audio Path Stats Endpoint ----
+@app.get("/api/audio-path-stats")
+async def audio_path_stats_endpoint():
+    """
+    Chunk, byte and buffer-allocation counters for the TTS -> playback path.
+    """
+    return audio_path_stats
+
+# ---- Barge-in Stats Endpoint ----
+@app.get("/api/barge-in-stats")
+async def barge_in_stats():
+    """
+    Latency from a "stop there" detection to the audio stream stopping.
+    """
+    return wake_word_dispatcher.stats()
+
+@app.get("/api/response-cache-stats")
+async def response_cache_stats():
+    """
+    Hits, misses and size of the replayable answer cache.
+    """
+    return response_cache.snapshot()
+
+def sample_queue_depths():
+    QUEUE_DEPTH.labels("chunk_queue").set(sum(q.qsize() for q in live_chunk_queues))
+    QUEUE_DEPTH.labels("phrase_queue").set(
+        sum(s.phrase_queue.qsize() for s in chat_sessions.values() if s.phrase_queue is not None))
+    QUEUE_DEPTH.labels("audio_queue_bytes").set(
+        sum(s.audio_queue.buffered_bytes() for s in chat_sessions.values() if s.audio_queue is not None))
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus exposition of pipeline stage timings, TTS/tool latencies and queue depths.
+    """
+    sample_queue_depths()
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/api/logging")
+async def get_logging_settings():
+    """
+    Current log level, category flags, sample rates and writer counters.
+    """
+    settings = CONFIG["LOGGING"]
+    return {
+        **{key: settings[key] for key in ("LEVEL", "FORMAT", "SAMPLE_RATES")},
+        "categories": {category: settings[flag] for category, (flag, _, _) in LOG_CATEGORIES.items()},
+        "written": log_writer.written,
+        "dropped": log_writer.dropped,
+        "queued": log_writer._queue.qsize(),
+    }
+
+@app.post("/api/logging")
+async def update_logging_settings(request: Request):
+    """
+    Changes logging at runtime. Accepts any of:
+    {"level": "info", "format": "text", "sample_rates": {"segment": 0.1},
+     "categories": {"segment": false}}
+    """
+    body = await request.json()
+    settings = CONFIG["LOGGING"]
+    if "level" in body:
+        if body["level"] not in LOG_LEVELS:
+            raise HTTPException(status_code=400, detail=f"level must be one of {list(LOG_LEVELS)}")
+        settings["LEVEL"] = body["level"]
+    if "format" in body:
+        if body["format"] not in ("json", "text"):
+            raise HTTPException(status_code=400, detail="format must be 'json' or 'text'")
+        settings["FORMAT"] = body["format"]
+    for category, rate in body.get("sample_rates", {}).items():
+        if category not in LOG_CATEGORIES or not 0 <= float(rate) <= 1:
+            raise HTTPException(status_code=400, detail=f"Invalid sample rate for '{category}'")
+        settings["SAMPLE_RATES"][category] = float(rate)
+    for category, enabled in body.get("categories", {}).items():
+        if category not in LOG_CATEGORIES:
+            raise HTTPException(status_code=400, detail=f"Unknown category '{category}'")
+        settings[LOG_CATEGORIES[category][0]] = bool(enabled)
+    return await get_logging_settings()
+
+@app.get("/api/tts-cache-stats")
+async def tts_cache_stats():
+    """
+    Hit rates and size of the phrase audio cache (memory and disk tiers).
+    """
+    if _phrase_audio_cache is None and not CONFIG["GENERAL_TTS"]["AUDIO_CACHE"]["ENABLED"]:
+        return {"enabled": False}
+    return get_phrase_audio_cache().snapshot()
+
 # ---- Stop TTS Endpoint ----
 @app.post("/api/stop-tts")
-async def stop_tts():
+async def stop_tts(session_id: Optional[str] = None):
     """
-    Manually set the global TTS_STOP_EVENT.
+    Sets the TTS stop event of the given session (or of every session when
+    no session_id is given).
     Any ongoing TTS/audio streaming will stop soon after it checks the event.
     """
-    TTS_STOP_EVENT.set()
+    for session in resolve_sessions(session_id):
+        session.stop_tts()
     return {"detail": "TTS stop event triggered. Ongoing TTS tasks should exit soon."}
 
 # ---- Stop Text Generation Endpoint ----
 @app.post("/api/stop-generation")
-async def stop_generation():
+async def stop_generation(session_id: Optional[str] = None):
     """
-    Manually set the global GEN_STOP_EVENT.
+    Sets the generation stop event of the given session (or of every session
+    when no session_id is given).
     Any ongoing streaming text generation will stop soon after it checks the event.
     """
-    GEN_STOP_EVENT.set()
+    for session in resolve_sessions(session_id):
+        session.stop_generation()
     return {"detail": "Generation stop event triggered. Ongoing text generation will exit soon."}
 
 # ---- Unified WebSocket Endpoint ----
 async def stream_stt_to_client(websocket: WebSocket):
-    while True:
-        recognized_text = stt_instance.get_speech_nowait()
-        if recognized_text:
+    subscriber = stt_instance.subscribe()
+    try:
+        while True:
+            recognized_text = await subscriber.get()
             await websocket.send_json({"stt_text": recognized_text})
-        await asyncio.sleep(0.05)
+    finally:
+        stt_instance.unsubscribe(subscriber)
+
+async def run_chat_turn(session: ChatSession, conversation: Conversation):
+    """
+    Runs one chat turn for a session: streams the completion to the client
+    and feeds the session's own TTS/audio pipeline. Whatever the assistant
+    said (even if interrupted) is appended to the conversation.
+    """
+    websocket = session.websocket
+    phrase_queue = session.phrase_queue
+    audio_queue = session.audio_queue
+
+    stt_instance.pause_listening()
+    await broadcast_stt_state()
+    conditional_print("STT paused before processing chat.", "segment")
+
+    prompt = conversation.prompt()
+    cache_key = response_cache.key_for(prompt) if CONFIG["RESPONSE_CACHE"]["ENABLED"] else None
+    cached = response_cache.get(cache_key) if cache_key else None
+
+    # Launch TTS and audio processing (a cache hit replays its recorded audio instead)
+    if cached is not None:
+        conditional_print("[Response Cache]: hit, replaying cached answer", "default")
+        process_streams_task = asyncio.create_task(replay_cached_audio(
+            audio_queue, session.tts_stop_event, session.audio_player, cached.audio
+        ))
+    else:
+        if cache_key:
+            audio_queue.start_recording()
+        process_streams_task = asyncio.create_task(process_streams(
+            phrase_queue, audio_queue, session.tts_stop_event, session.audio_player
+        ))
+
+    # Stream the chat completion
+    reply_parts: List[str] = []
+    prompt_length = len(prompt)
+    completed = False
+    try:
+        if cached is not None:
+            for content in cached.text_chunks:
+                reply_parts.append(content)
+                await websocket.send_json({"content": content})
+        else:
+            async for content in stream_openai_completion(prompt, phrase_queue, session.gen_stop_event):
+                if session.gen_stop_event.is_set():
+                    conditional_print("Generation stop event is set, halting chat streaming to client.", "default")
+                    break
+                reply_parts.append(content)
+                await websocket.send_json({"content": content})
+        completed = True
+    finally:
+        conversation.add_assistant_text("".join(reply_parts))
+        conversation.schedule_summary()
+        # Signal end of TTS text
+        await phrase_queue.put(None)
+        await process_streams_task
+        stopped_at = session.audio_player.last_stopped_at
+        if session.stop_requested_at is not None and stopped_at is not None and stopped_at >= session.stop_requested_at:
+            observe_stage("stop", stopped_at - session.stop_requested_at)
+
+        # Only answers that were generated and played to the end are cached
+        if (cache_key and cached is None and completed and reply_parts
+                and not session.gen_stop_event.is_set() and not session.tts_stop_event.is_set()):
+            tools_used = {m["name"] for m in prompt[prompt_length:] if m.get("role") == "tool"}
+            audio = bytes(audio_queue.recording) if audio_queue.recording else None
+            if audio is not None or not CONFIG["GENERAL_TTS"]["TTS_ENABLED"]:
+                response_cache.store(cache_key, reply_parts, audio, tools_used)
+        wake_word_dispatcher.record_barge_in(session)
+
+        # Resume STT after TTS, unless another session is still talking
+        if not any(other.is_busy for other in chat_sessions.values() if other is not session):
+            stt_instance.start_listening()
+            await broadcast_stt_state()
+            conditional_print("STT resumed after processing chat.", "segment")
 
 @app.websocket("/ws/chat")
 async def unified_chat_websocket(websocket: WebSocket):
     await websocket.accept()
-    print("Client connected to /ws/chat")
+    session = ChatSession(websocket)
+    chat_sessions[session.session_id] = session
+    log_session_id.set(session.session_id)
+    print(f"Client connected to /ws/chat (session {session.session_id})")
     connected_websockets.add(websocket)
+    await websocket.send_json({"session_id": session.session_id})
 
     # Start a background task that streams recognized STT text
     stt_task = asyncio.create_task(stream_stt_to_client(websocket))
@@ -905,53 +3423,37 @@ async def unified_chat_websocket(websocket: WebSocket):
                 await broadcast_stt_state()
 
             elif action == "chat":
-                # Clear any old stop events
-                TTS_STOP_EVENT.clear()
-                GEN_STOP_EVENT.clear()
-
-                messages = data.get("messages", [])
-                validated = await validate_messages_for_ws(messages)
-
-                phrase_queue = asyncio.Queue()
-                audio_queue = asyncio.Queue()
-
-                stt_instance.pause_listening()
-                await broadcast_stt_state()
-                conditional_print("STT paused before processing chat.", "segment")
+                # A new turn supersedes whatever this session was still doing
+                await session.cancel_generation()
 
-                # Launch TTS and audio processing
-                process_streams_task = asyncio.create_task(process_streams(
-                    phrase_queue, audio_queue, TTS_STOP_EVENT
-                ))
+                conversation, created = await resolve_conversation(data)
+                if conversation is None:
+                    # Unknown id (e.g. server restart): ask for the full history once
+                    await websocket.send_json({"conversation_unknown": data.get("conversation_id")})
+                    continue
+                if created:
+                    await websocket.send_json({"conversation_id": conversation.conversation_id})
 
-                # Stream the chat completion
-                try:
-                    async for content in stream_openai_completion(validated, phrase_queue):
-                        if GEN_STOP_EVENT.is_set():
-                            conditional_print("GEN_STOP_EVENT is set, halting chat streaming to client.", "default")
-                            break
-                        await websocket.send_json({"content": content})
-                finally:
-                    # Signal end of TTS text
-                    await phrase_queue.put(None)
-                    await process_streams_task
-
-                    # Resume STT after TTS
-                    stt_instance.start_listening()
-                    await broadcast_stt_state()
-                    conditional_print("STT resumed after processing chat.", "segment")
+                session.reset_pipeline()
+                session.generation_task = asyncio.create_task(run_chat_turn(session, conversation))
 
     except WebSocketDisconnect:
-        print("Client disconnected from /ws/chat")
+        print(f"Client disconnected from /ws/chat (session {session.session_id})")
     except Exception as e:
         print(f"WebSocket error in unified_chat_websocket: {e}")
     finally:
         stt_task.cancel()
+        await session.cancel_generation()
+        chat_sessions.pop(session.session_id, None)
         connected_websockets.discard(websocket)
-        stt_instance.pause_listening()
+        if not any_session_busy():
+            stt_instance.pause_listening()
         await broadcast_stt_state()
-        await websocket.send_json({"is_listening": False})
-        await websocket.close()
+        try:
+            await websocket.send_json({"is_listening": False})
+            await websocket.close()
+        except Exception:
+            pass
 
 # =========== Use FastAPI's built-in shutdown event ===========
 @app.on_event("shutdown")
@@ -967,6 +3469,73 @@ app.include_router(router)
 
 # ============== BACKGROUND WAKE WORD THREAD ==============
 
+class WakeWordDispatcher:
+    """
+    Thread-safe command channel from the wake word thread to the event loop.
+    The detector calls send(); the command runs on the loop via
+    call_soon_threadsafe, without any HTTP round-trip.
+    Also keeps the barge-in latency (detection -> audio stopped) history.
+    """
+    def __init__(self, history: int = 100):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.barge_in_latencies_ms = deque(maxlen=history)
+        self.dispatch_latencies_ms = deque(maxlen=history)
+        # The loop only keeps weak references to tasks; hold them until they finish
+        self._tasks: Set[asyncio.Task] = set()
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+
+    def send(self, command: str):
+        """
+        Called from the detector thread.
+        """
+        if self.loop is None:
+            print(f"[WakeWord Thread] No event loop bound; dropping '{command}'.")
+            return
+        self.loop.call_soon_threadsafe(self._dispatch, command, time.perf_counter())
+
+    def _dispatch(self, command: str, detected_at: float):
+        self.dispatch_latencies_ms.append((time.perf_counter() - detected_at) * 1000)
+        if command == "stop":
+            for session in chat_sessions.values():
+                if session.is_busy and session.barge_in_at is None:
+                    session.barge_in_at = detected_at
+                session.stop_tts()
+                session.stop_generation()
+        elif command == "start-stt":
+            task = asyncio.create_task(start_stt_endpoint())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            conditional_print(f"Unknown wake word command: {command}", "default")
+
+    def record_barge_in(self, session: ChatSession):
+        """
+        Called once a turn's audio has finished; records how long it took
+        from the wake word to the audio stream actually stopping.
+        """
+        stopped_at = session.audio_player.last_stopped_at
+        if session.barge_in_at is None or stopped_at is None or stopped_at < session.barge_in_at:
+            return
+        latency_ms = (stopped_at - session.barge_in_at) * 1000
+        self.barge_in_latencies_ms.append(latency_ms)
+        conditional_print(f"Barge-in latency (session {session.session_id}): {latency_ms:.1f} ms", "default")
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self.barge_in_latencies_ms)
+        return {
+            "barge_in_count": len(latencies),
+            "barge_in_last_ms": self.barge_in_latencies_ms[-1] if latencies else None,
+            "barge_in_p50_ms": latencies[len(latencies) // 2] if latencies else None,
+            "barge_in_max_ms": latencies[-1] if latencies else None,
+            "dispatch_last_ms": self.dispatch_latencies_ms[-1] if self.dispatch_latencies_ms else None,
+        }
+
+
+wake_word_dispatcher = WakeWordDispatcher()
+
+
 def listen_for_wake_words():
     """
     Continuously listens for multiple Porcupine keywords.
@@ -989,57 +3558,71 @@ def listen_for_wake_words():
         keyword_paths=[stop_there_path, computer_path]
     )
 
-    pa = pyaudio.PyAudio()
-    audio_stream = pa.open(
-        rate=porcupine.sample_rate,
-        channels=1,
-        format=pyaudio.paInt16,
-        input=True,
-        frames_per_buffer=porcupine.frame_length
-    )
+    if porcupine.sample_rate != microphone_bus.sample_rate:
+        porcupine.delete()
+        raise ValueError(
+            f"Porcupine needs {porcupine.sample_rate} Hz but the microphone bus captures "
+            f"{microphone_bus.sample_rate} Hz; fix CONFIG['MICROPHONE']['SAMPLE_RATE']."
+        )
+    reader = microphone_bus.subscribe()
 
     try:
         while True:
-            pcm = audio_stream.read(porcupine.frame_length, exception_on_overflow=False)
+            pcm = reader.read(porcupine.frame_length)
+            if pcm is None:
+                break
             pcm = struct.unpack_from("h" * porcupine.frame_length, pcm)
 
             keyword_index = porcupine.process(pcm)
             # If no keyword is detected, keyword_index will be -1
             if keyword_index == 0:
                 # "stop there" was detected
+                wake_word_dispatcher.send("stop")
                 print("[WakeWord Thread] Detected 'stop there' -> stopping TTS and generation.")
-                try:
-                    requests.post("http://localhost:8000/api/stop-tts")
-                    requests.post("http://localhost:8000/api/stop-generation")
-                except Exception as e:
-                    print(f"[WakeWord Thread] Error calling stop endpoints: {e}")
 
             elif keyword_index == 1:
                 # "computer" was detected
+                wake_word_dispatcher.send("start-stt")
                 print("[WakeWord Thread] Detected 'computer' -> starting STT if paused.")
-                try:
-                    requests.post("http://localhost:8000/api/start-stt")
-                except Exception as e:
-                    print(f"[WakeWord Thread] Error calling start-stt endpoint: {e}")
 
     except KeyboardInterrupt:
         print("[WakeWord Thread] Stopping on KeyboardInterrupt.")
     finally:
-        audio_stream.close()
-        pa.terminate()
         porcupine.delete()
         print("[WakeWord Thread] Exiting.")
 
 # =========== Startup Event ===========
 @app.on_event("startup")
-def start_wake_word_thread():
+async def start_wake_word_thread():
     """
-    Spawns a daemon thread that listens for wake words continuously.
+    Starts the shared microphone capture, then spawns a daemon thread that
+    listens for wake words continuously.
+    Detections are dispatched onto this event loop.
     """
+    wake_word_dispatcher.bind(asyncio.get_running_loop())
+    microphone_bus.start()
     thread = threading.Thread(target=listen_for_wake_words, daemon=True)
     thread.start()
     print("[Startup] Wake word detection thread started.")
 
+@app.on_event("startup")
+async def prewarm_timezone_finder():
+    """
+    Loads TimezoneFinder's polygon data off the loop so the first get_time call is fast.
+    """
+    await asyncio.get_running_loop().run_in_executor(tool_executor, get_timezone_finder)
+    print("[Startup] TimezoneFinder loaded.")
+
+@app.on_event("startup")
+async def prewarm_tts():
+    """
+    Opens the Azure synthesizer connections before the first chat arrives.
+    """
+    if CONFIG["GENERAL_TTS"]["TTS_PROVIDER"].lower() == "azure" \
+            and CONFIG["TTS_MODELS"]["AZURE_TTS"]["PREWARM_SYNTHESIZERS"]:
+        await azure_synthesizer_pool.start()
+        print("[Startup] Azure TTS synthesizers pre-warmed.")
+
 if __name__ == '__main__':
     # Let uvicorn handle Ctrl+C and signals cleanly.
     uvicorn.run(
@@ -309,6 +309,8 @@ const ChatInterface = () => {
   const listRef = useRef(null);
   const rowHeightsRef = useRef({});
   const websocketRef = useRef(null);
+  const sessionIdRef = useRef(null);
+  const conversationIdRef = useRef(null);
   const messagesRef = useRef(messages);
   const textareaRef = useRef(null);
 
@@ -341,6 +343,17 @@ const ChatInterface = () => {
     }
   }, [darkMode]);
 
+  // The backend keeps the conversation history, so a turn only uploads the new message
+  const sendChat = (message) => {
+    websocketRef.current.send(
+      JSON.stringify({
+        action: 'chat',
+        conversation_id: conversationIdRef.current,
+        message: { sender: message.sender, text: message.text },
+      })
+    );
+  };
+
   // WebSocket setup
   useEffect(() => {
     let isMounted = true;
@@ -358,6 +371,28 @@ const ChatInterface = () => {
       try {
         const data = JSON.parse(event.data);
 
+        if (data.session_id) {
+          sessionIdRef.current = data.session_id;
+          console.log('Chat session:', data.session_id);
+        }
+
+        if (data.conversation_id) {
+          conversationIdRef.current = data.conversation_id;
+        }
+
+        if (data.conversation_unknown) {
+          // Backend lost this conversation (e.g. restart): resend the full history once
+          websocketRef.current.send(
+            JSON.stringify({
+              action: 'chat',
+              conversation_id: conversationIdRef.current,
+              messages: messagesRef.current
+                .filter((m) => m.text)
+                .map(({ sender, text }) => ({ sender, text })),
+            })
+          );
+        }
+
         if (data.stt_text) {
           const sttMsg = {
             id: Date.now(),
@@ -367,12 +402,7 @@ const ChatInterface = () => {
           };
           setMessages((prev) => [...prev, sttMsg]);
           setIsGenerating(true);
-          websocketRef.current.send(
-            JSON.stringify({
-              action: 'chat',
-              messages: [...messagesRef.current, sttMsg],
-            })
-          );
+          sendChat(sttMsg);
         }
 
         if (data.content) {
@@ -445,13 +475,23 @@ const ChatInterface = () => {
     };
   }, []);
 
+  // Scope stop requests to this tab's backend session
+  const sessionQuery = () =>
+    sessionIdRef.current
+      ? `?session_id=${encodeURIComponent(sessionIdRef.current)}`
+      : '';
+
   // Stop generation + TTS
   const handleStop = async () => {
     setIsStoppingGeneration(true);
     try {
       const [genRes, ttsRes] = await Promise.all([
-        fetch('http://localhost:8000/api/stop-generation', { method: 'POST' }),
-        fetch('http://localhost:8000/api/stop-tts', { method: 'POST' }),
+        fetch(`http://localhost:8000/api/stop-generation${sessionQuery()}`, {
+          method: 'POST',
+        }),
+        fetch(`http://localhost:8000/api/stop-tts${sessionQuery()}`, {
+          method: 'POST',
+        }),
       ]);
 
       if (!genRes.ok) {
@@ -486,7 +526,7 @@ const ChatInterface = () => {
         );
         if (!data.tts_enabled) {
           const stopTtsResponse = await fetch(
-            'http://localhost:8000/api/stop-tts',
+            `http://localhost:8000/api/stop-tts${sessionQuery()}`,
             { method: 'POST' }
           );
           if (!stopTtsResponse.ok) {
@@ -566,16 +606,8 @@ const ChatInterface = () => {
         },
       ]);
 
-      websocketRef.current.send(
-        JSON.stringify({
-          action: 'chat',
-          messages: [...messagesRef.current, newMessage],
-        })
-      );
-      console.log('Sent chat action with messages:', [
-        ...messagesRef.current,
-        newMessage,
-      ]);
+      sendChat(newMessage);
+      console.log('Sent chat action with message:', newMessage);
     } catch (error) {
       console.error('Error sending message:', error);
       setIsGenerating(false);
@@ -586,6 +618,8 @@ const ChatInterface = () => {
   const handleClearChat = async () => {
     try {
       if (isGenerating) await handleStop();
+      // Start a fresh server-side conversation so the cleared history is out of the context too
+      conversationIdRef.current = null;
       setMessages([]);
       setInputMessage('');
       setSttTranscript('');